@@ -1,8 +1,36 @@
-from .universe import Universe
-from .objects import *
 from .utils.tools import Vec3
 
 
+# Rendering pulls in pygame, so it is only imported on first use (PEP 562). Physics code
+# (astronim.simulation, astronim.utils.leapfrog, astronim.utils.forces) imports without it.
+_LAZY = {
+    "Universe": ".universe",
+    "Star": ".objects",
+    "Galaxy": ".objects",
+    "GalaxyTemplate": ".objects",
+    "BlackHole": ".objects",
+    "Text": ".objects",
+    "LineBetween": ".objects",
+    "Graph": ".objects",
+    "LineSet": ".objects",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
 __all__ = [
     "Universe",
     "Vec3",
@@ -0,0 +1,52 @@
+class FrameClock:
+    '''Deterministic clock for animations, advanced once per rendered frame.
+
+    Animations read the clock instead of wall time, so a frame looks the same whether it took
+    1 ms or 2 s to render, and any frame can be rendered on its own by seeking to it.
+
+    Attributes
+    ----------
+    fps : float
+        Frames per second of the output video. Animation time advances 1 / fps per frame.
+    frame : int
+        Index of the frame being drawn.
+    sim_time : float
+        Simulated seconds that have passed, the sum of the dt of every tick.
+
+    Methods
+    -------
+    tick(dt):
+        Moves to the next frame.
+    seek(frame, dt):
+        Jumps to a frame, assuming a constant simulation step of dt before it.
+    '''
+    def __init__(self, fps: float = 60, frame: int = 0, sim_time: float = 0.0):
+        self.fps = fps
+        self.frame = frame
+        self.sim_time = sim_time
+
+    @property
+    def time(self):
+        '''Animation time in seconds, frame / fps.'''
+        return self.frame / self.fps
+
+    @property
+    def milliseconds(self):
+        return 1000 * self.frame / self.fps
+
+    def tick(self, dt: float = 0.0):
+        '''
+        params
+        ------
+        dt : float
+            Simulated seconds covered by the frame that just finished.
+        '''
+        self.frame += 1
+        self.sim_time += dt
+
+    def seek(self, frame: int, dt: float = 0.0):
+        self.frame = frame
+        self.sim_time = frame * dt
+
+    def __repr__(self):
+        return f"FrameClock(fps={self.fps}, frame={self.frame}, sim_time={self.sim_time})"
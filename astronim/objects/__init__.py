@@ -1,9 +1,10 @@
 from .star import Star
-from .galaxy import Galaxy
+from .galaxy import Galaxy, GalaxyTemplate
 from .blackhole import BlackHole   
 from .text import Text
 from .line_between import LineBetween
 from .graph import Graph
+from .line_set import LineSet
 
 
-__all__ = ["Star", "Galaxy", "BlackHole", "Text", "LineBetween", "Graph"]
\ No newline at end of file
+__all__ = ["Star", "Galaxy", "GalaxyTemplate", "BlackHole", "Text", "LineBetween", "Graph", "LineSet"]
\ No newline at end of file
@@ -1,8 +1,10 @@
 import pygame 
 import numpy as np
 import random
-from astronim.utils.tools import get_2d, Vec3, distance
-from astronim.utils.constants import DEPTH
+from astronim.clock import FrameClock
+from astronim.utils.tools import Vec3, distance, Projection
+from .glow import draw_glow_circle
+from .trail import draw_trail
 
 
 class BlackHole: 
@@ -15,19 +17,24 @@ class BlackHole:
         self.color = color
 
         self.trail = trail
-        self.trail_list = []
+        self.trail_row = None # row in Simulation.trail_buffer, set by the simulation
         self.trail_length = 50
+        self.trail_fade = 0 # number of dimming bands towards the tail, 0 for a solid trail
        
 
 
+    def bounding_sphere(self): 
+        '''World-space center and radius used for frustum culling.'''
+        return [self.pos.x, self.pos.y, self.pos.z], 0.0
+
     def draw(self, screen): 
 
         dist = distance(self.pos, BlackHole.camera)
 
-        obj_pos_2d = get_2d(self.pos - BlackHole.camera, BlackHole.rx, BlackHole.ry)
+        obj_pos_2d = BlackHole.projection.project_point(self.pos)
         if obj_pos_2d:
             # scale radius with depth
-            self.radius = max(2, int(self.base_radius * DEPTH / dist))
+            self.radius = max(2, int(self.base_radius * BlackHole.projection.depth / dist))
 
             self.draw_star(obj_pos_2d, (250, 226, 67), screen, radius=self.radius, glow_radius=self.radius )
             self.draw_star(obj_pos_2d, (255, 183, 0), screen, radius=self.radius, glow_radius=self.radius *2)
@@ -36,39 +43,26 @@ class BlackHole:
 
 
     def draw_glow_circle(self, surface, color, center, radius, glow_radius, width):
-        
-        glow_surf = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-
-        # multiple circles with decreasing alpha for glow
-        for i in np.arange(glow_radius, radius, -1):
-            t =  (i - radius) / (glow_radius - radius)
-            alpha = int(255 * np.exp(-4 * t))
-            pygame.draw.circle(glow_surf, (*color, alpha), (glow_radius, glow_radius), i, width=width)
-
-
-        glow_rect = glow_surf.get_rect(center=center)
-        surface.blit(glow_surf, glow_rect, special_flags = pygame.BLEND_ALPHA_SDL2 )
-
-        pygame.draw.circle(surface, color, center, radius, width=width)
+        # one blit of a cached sprite, see astronim.objects.glow
+        draw_glow_circle(surface, color, center, radius, glow_radius, width)
 
 
     def draw_star(self, obj_pos_2d, color, screen, width = 0, radius = 2, glow_radius = 20):
         self.draw_glow_circle(screen, color, obj_pos_2d, radius=radius, glow_radius=glow_radius, width = width)
 
-    def draw_trail(self, screen): 
-        obj_path_2d = [
-                pt for pt in (get_2d(Vec3(*p) - BlackHole.camera, BlackHole.rx, BlackHole.ry) for p in self.trail_list) if pt ]
-        
-        if len(obj_path_2d) >1:
-            pygame.draw.lines(screen, (255, 255, 255), False, obj_path_2d, 1)
+    def draw_trail(self, screen, obj_path_2d): 
+        '''Draws the trail through already projected (and simplified) points, see Renderer.trail_path.'''
+        draw_trail(screen, obj_path_2d, fade=self.trail_fade)
 
 
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
         cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
 
 
     
@@ -1,9 +1,11 @@
 import numpy as np
 import pygame
 import math
-from astronim.utils.tools import gaussianRandom, clamp, spiral, Vec3, get_2d
+from astronim.clock import FrameClock
+from astronim.utils.tools import spiral_points, euler_rotation, Vec3, Projection
 from .star import Star
-import random
+from .glow import draw_glow_circle
+from .impostor import impostor_cache, light_to_rgba
 
 NUM_STARS = 500
 NUM_ARMS = 4
@@ -28,171 +30,278 @@ ARMS = 4
 
 HAZE_RATIO = 0.5
 
+#level of detail, by apparent galaxy radius in pixels
+LOD_PIXELS = 150 #below this only a subset of the stars is drawn
+BILLBOARD_PIXELS = 60 #below this a cached offscreen rendering is reused
+IMPOSTOR_PIXELS = 4 #below this the galaxy is a single glow sprite
+MIN_LOD_STARS = 32
+
 starTypes = {
     "percentage" : [76.45, 12.1, 7.6, 3.0, 0.6, 0.13],
     "colors" : [(255, 205, 111), (255, 210, 161), (255, 244, 234), (248, 247, 255), (202, 215, 255), (170, 191, 255)]
 }
 
 
-class Galaxy: 
-    def __init__(self, pos:Vec3, galaxy_type: str = 'spiral_galaxy', color = None):
-        # init function should draw the galaxy using only these args 
+def galaxy_sprite_size(projection): 
+    '''Core and glow radius in pixels of one galaxy star (2 and 20 at the reference focal length).'''
+    return max(1, int(2 * projection.pixel_scale)), max(2, int(20 * projection.pixel_scale))
+
+
+class GalaxyTemplate: 
+    '''Immutable local star positions and colors that any number of Galaxy instances can share. 
+
+    Memory scales with the number of templates, not instances: each Galaxy only keeps its own 
+    position, orientation, scale and tint, which are applied while projecting. 
+
+    Attributes
+    ----------
+    local_positions : np.ndarray
+        Read-only (N, 3) star positions relative to the galaxy center. 
+    colors : np.ndarray
+        Read-only (N, 3) uint8 star colors. 
+    radius : float
+        Distance from the center to the farthest star. 
+    lod_order : np.ndarray
+        Random order of the stars. Decimated levels of detail draw a prefix of it, 
+        so the subset is an even sample of the galaxy and stays the same between frames. 
+    mean_color : tuple
+        Average star color, used for the single-sprite impostor. 
+
+    Methods
+    -------
+    tinted_colors(tint): 
+        The colors multiplied by a tint, computed once per tint and shared. 
+    '''
+    def __init__(self, galaxy_type: str = 'spiral_galaxy', color = None, num_stars: int = NUM_STARS, seed = None):
         self.galaxy_type = galaxy_type
         self.color = color
-        
-        self.pos = Vec3(pos.x, pos.y, pos.z)
-
-        types = {'spiral_galaxy': self.spiral_positions(), 'irregular_galaxy':self.irregular_positions(), "elliptical_galaxy":self.elliptical_positions()}
-        self.positions = types[galaxy_type]
-
-        
-
-    def update(self, camera, rx, ry):
-        # just re-draw based on camera position/rotation
-        self.draw(self.pos, camera, rx, ry)
+        self.num_stars = num_stars
+        self.rng = np.random.default_rng(seed)
+
+        # only the requested type is generated
+        types = {'spiral_galaxy': self.spiral_positions, 'irregular_galaxy':self.irregular_positions, "elliptical_galaxy":self.elliptical_positions}
+        if galaxy_type not in types: 
+            raise ValueError(f"Unknown galaxy_type '{galaxy_type}', expected one of {list(types)}")
+
+        self.local_positions = types[galaxy_type]()
+        self.colors = self.get_star_colors(len(self.local_positions))
+        self.local_positions.setflags(write=False)
+        self.colors.setflags(write=False)
+
+        self.radius = float(np.sqrt((self.local_positions ** 2).sum(axis=1).max())) if len(self.local_positions) else 0.0
+        self.lod_order = self.rng.permutation(len(self.local_positions))
+        self.mean_color = tuple(self.colors.mean(axis=0).astype(int).tolist()) if len(self.colors) else (0, 0, 0)
+        self._tinted = {}
+
+    def tinted_colors(self, tint): 
+        if tint is None: 
+            return self.colors
+
+        tint = tuple(int(c) for c in tint)
+        if tint not in self._tinted: 
+            colors = (self.colors * (np.array(tint) / 255)).astype(np.uint8)
+            colors.setflags(write=False)
+            self._tinted[tint] = colors
+        return self._tinted[tint]
+
+    def gaussian(self, mean, stdev, n): 
+        return self.rng.normal(mean, stdev, n)
+
+    def core_positions(self, n): 
+        inner = np.column_stack([self.gaussian(0, CORE_X_DIST, n), 
+                                 self.gaussian(0, CORE_Y_DIST, n), 
+                                 self.gaussian(0, GALAXY_THICKNESS, n)])
+        outer = np.column_stack([self.gaussian(0, OUTER_CORE_X_DIST, n), 
+                                 self.gaussian(0, OUTER_CORE_Y_DIST, n), 
+                                 self.gaussian(0, GALAXY_THICKNESS, n)])
+        return [inner, outer]
 
     def spiral_positions(self): 
-        stars = [] #pos and color of star in the form [[vec, color], [vec, color], ...]
-
-        for i in range(NUM_STARS // 4):
-            x = gaussianRandom(0, CORE_X_DIST)
-            y = gaussianRandom(0, CORE_Y_DIST)
-            z = gaussianRandom(0, GALAXY_THICKNESS)
-            stars.append([Vec3(x, y, z), self.get_star_color()])
-            
-
-        for i in range(NUM_STARS // 4):
-            x = gaussianRandom(0, OUTER_CORE_X_DIST)
-            y = gaussianRandom(0, OUTER_CORE_Y_DIST)
-            z = gaussianRandom(0, GALAXY_THICKNESS)
-            stars.append([Vec3(x, y, z), self.get_star_color()])
-
-
+        n = self.num_stars // 4
+        stars = self.core_positions(n)
 
         for arm in range(int(ARMS)): 
             offset = arm *2 * math.pi / ARMS
 
-            for i in range(NUM_STARS // 4):
-                pos = spiral(
-                    gaussianRandom(ARM_X_MEAN, ARM_X_DIST), 
-                    gaussianRandom(ARM_Y_MEAN, ARM_Y_DIST), 
-                    gaussianRandom(0, GALAXY_THICKNESS), 
-                    offset
-                )
-                stars.append([pos, self.get_star_color()])
-
-        self.stars = stars
-        return self.stars
+            stars.append(spiral_points(
+                self.gaussian(ARM_X_MEAN, ARM_X_DIST, n), 
+                self.gaussian(ARM_Y_MEAN, ARM_Y_DIST, n), 
+                self.gaussian(0, GALAXY_THICKNESS, n), 
+                offset
+            ))
+
+        return np.concatenate(stars)
     
     def irregular_positions(self): 
-        stars = [] #pos and color of star in the form [[vec, color], [vec, color], ...]
+        n = self.num_stars // 4
+        stars = self.core_positions(n)
 
-        for i in range(NUM_STARS // 4):
-            x = gaussianRandom(0, CORE_X_DIST)
-            y = gaussianRandom(0, CORE_Y_DIST)
-            z = gaussianRandom(0, GALAXY_THICKNESS)
-            stars.append([Vec3(x, y, z), self.get_star_color()])
+        stars.append(np.column_stack([self.gaussian(ARM_X_MEAN, ARM_X_DIST, n), 
+                                      self.gaussian(ARM_Y_MEAN, ARM_Y_DIST, n), 
+                                      self.gaussian(0, GALAXY_THICKNESS, n)]))
 
-        for i in range(NUM_STARS // 4):
-            x = gaussianRandom(0, OUTER_CORE_X_DIST)
-            y = gaussianRandom(0, OUTER_CORE_Y_DIST)
-            z = gaussianRandom(0, GALAXY_THICKNESS)
-            stars.append([Vec3(x, y, z), self.get_star_color()])
+        return np.concatenate(stars)
+    
+    def elliptical_positions(self):
+        MAJOR_AXIS = 75  
+        MINOR_AXIS = 50  
+        Z_THICKNESS = 5  
 
-        
+        n = self.num_stars
+        angle = self.rng.uniform(0, 2 * math.pi, n)
+        radius_major = np.abs(self.gaussian(0, MAJOR_AXIS, n))
+        radius_minor = radius_major * (MINOR_AXIS / MAJOR_AXIS)
 
-        for i in range(NUM_STARS // 4):
+        return np.column_stack([radius_major * np.cos(angle), 
+                                radius_minor * np.sin(angle), 
+                                self.gaussian(0, Z_THICKNESS, n)])
+    
+    def get_star_colors(self, n): 
+        palette = np.array(starTypes["colors"], dtype=np.uint8)
 
-            x = gaussianRandom(ARM_X_MEAN, ARM_X_DIST)
-            y = gaussianRandom(ARM_Y_MEAN, ARM_Y_DIST)
-            z = gaussianRandom(0, GALAXY_THICKNESS)
-            stars.append([Vec3(x, y, z), self.get_star_color()])
+        # pick the first star type whose cumulative percentage reaches r
+        r = self.rng.uniform(0, 100, n)
+        index = np.searchsorted(np.cumsum(starTypes["percentage"]), r)
+        leftover = index == len(palette)
+        index[leftover] = self.rng.integers(0, len(palette), np.count_nonzero(leftover))
+        colors = palette[index]
 
+        if self.color: 
+            colors[self.rng.integers(0, 2, n) == 0] = self.color
 
+        return colors
 
-        self.stars = stars
-        return self.stars
-    
-    def elliptical_positions(self):
-        stars = []
 
-        MAJOR_AXIS = 75  
-        MINOR_AXIS = 50  
-        Z_THICKNESS = 5  
+class Galaxy: 
+    '''A galaxy of glowing stars. 
+
+    The stars live in a GalaxyTemplate. Pass template to share one between many galaxies, 
+    each with its own pos, orientation (rotation angles about x, y and z in radians), 
+    scale and tint. Without a template a new one is generated from galaxy_type, color, 
+    num_stars and seed. 
+
+    Below lod_pixels of apparent radius only a subset of the stars is drawn, below 
+    billboard_pixels a cached offscreen rendering is scaled and reused (see astronim.objects.impostor), 
+    and below impostor_pixels the whole galaxy is a single glow sprite. 
+    '''
+    def __init__(self, pos:Vec3, galaxy_type: str = 'spiral_galaxy', color = None, num_stars: int = NUM_STARS, seed = None, 
+                 template: GalaxyTemplate = None, orientation = (0, 0, 0), scale: float = 1.0, tint = None, 
+                 lod_pixels: float = LOD_PIXELS, billboard_pixels: float = BILLBOARD_PIXELS, 
+                 impostor_pixels: float = IMPOSTOR_PIXELS):
+        if template is None: 
+            template = GalaxyTemplate(galaxy_type, color, num_stars, seed)
+
+        self.template = template
+        self.galaxy_type = template.galaxy_type
+        self.color = template.color
+        
+        self.pos = Vec3(pos.x, pos.y, pos.z)
+        self.orientation = orientation
+        self.scale = scale
+        self.tint = tint
+        self.lod_pixels = lod_pixels
+        self.billboard_pixels = billboard_pixels
+        self.impostor_pixels = impostor_pixels
 
-        for _ in range(NUM_STARS):
-            
-            angle = random.uniform(0, 2 * math.pi)
-            radius_major = abs(gaussianRandom(0, MAJOR_AXIS))
-            radius_minor = radius_major * (MINOR_AXIS / MAJOR_AXIS)
+        
 
-            x = radius_major * math.cos(angle)
-            y = radius_minor * math.sin(angle)
-            z = gaussianRandom(0, Z_THICKNESS)
+    @property
+    def local_positions(self): 
+        return self.template.local_positions
 
-            stars.append([Vec3(x, y, z), self.get_star_color()])
+    @property
+    def colors(self): 
+        return self.template.tinted_colors(self.tint)
+
+    def transform(self): 
+        '''The 3x3 linear part and translation taking template positions into world space.'''
+        linear = self.scale * euler_rotation(*self.orientation)
+        return linear, np.array([self.pos.x, self.pos.y, self.pos.z])
+
+    def bounding_sphere(self): 
+        '''World-space center and radius used for frustum culling.'''
+        return [self.pos.x, self.pos.y, self.pos.z], self.template.radius * self.scale
+
+    def update(self, camera, rx, ry):
+        # just re-draw based on camera position/rotation
+        self.draw(self.pos, camera, rx, ry)
 
-        self.stars = stars
-        return self.stars
-    
     def draw(self, screen):
-        for local_star in self.positions:
-            # Convert local star position to world space
-            world_star = Vec3(
-                self.pos.x + local_star[0].x,
-                self.pos.y + local_star[0].y,
-                self.pos.z + local_star[0].z
-            )
-
-            # Project to 2D
-            star_2d = get_2d(world_star - Galaxy.camera, Galaxy.rx, Galaxy.ry)
-            if star_2d:
-                self.draw_glow_circle(screen, local_star[1], star_2d, radius=2, glow_radius=20)
+        linear, translation = self.transform()
+        apparent = Galaxy.projection.screen_radius(translation, self.template.radius * self.scale)
+
+        if apparent < self.impostor_pixels: 
+            center = Galaxy.projection.project_point(self.pos)
+            if center: 
+                _, glow = galaxy_sprite_size(Galaxy.projection)
+                draw_glow_circle(screen, self.template.mean_color, center, radius=max(1, int(apparent)), glow_radius=int(apparent) + glow)
+            return
+
+        if apparent < self.billboard_pixels: 
+            center = Galaxy.projection.project_point(self.pos)
+            if center: 
+                orientation = Galaxy.projection.rotation @ euler_rotation(*self.orientation)
+                offset = translation - Galaxy.projection.camera
+                direction = offset / max(np.linalg.norm(offset), 1e-12)
+                billboard = impostor_cache.get(self, orientation, direction, apparent, 
+                                               lambda: self.render_billboard(linear, translation, apparent, center))
+                screen.blit(billboard, billboard.get_rect(center=center), special_flags = pygame.BLEND_ALPHA_SDL2)
+            return
+
+        local, colors = self.local_positions, self.colors
+        if apparent < self.lod_pixels: 
+            keep = max(MIN_LOD_STARS, int(len(local) * (apparent / self.lod_pixels) ** 2))
+            subset = self.template.lod_order[:keep]
+            local, colors = local[subset], colors[subset]
+
+        # one transform for the whole instance, then every star is projected at once
+        xy, visible, _ = Galaxy.projection.project_instance(local, linear, translation)
+
+        # skip stars whose glow can't reach the screen
+        projection = Galaxy.projection
+        core, glow = galaxy_sprite_size(projection)
+        visible &= (xy[:, 0] > -glow) & (xy[:, 0] < projection.width + glow) & (xy[:, 1] > -glow) & (xy[:, 1] < projection.height + glow)
+
+        for i in np.flatnonzero(visible):
+            self.draw_glow_circle(screen, colors[i], tuple(xy[i].tolist()), radius=core, glow_radius=glow)
   
 
         
 
-    def draw_glow_circle(self, surface, color, center, radius, glow_radius):
-        
-        glow_surf = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+    def render_billboard(self, linear, translation, apparent, center): 
+        '''Draws every star into an offscreen SRCALPHA surface centered on the galaxy.'''
+        core, glow = galaxy_sprite_size(Galaxy.projection)
+        half = int(apparent) + glow + 1
+        surface = pygame.Surface((2 * half + 1, 2 * half + 1))
+
+        xy, visible, _ = Galaxy.projection.project_instance(self.local_positions, linear, translation)
+        xy = xy - center + half
 
-        # multiple circles with decreasing alpha for glow
-        for i in np.arange(glow_radius, radius, -1):
-            t =  (i - radius) / (glow_radius - radius)
-            alpha = int(255 * np.exp(-4 * t))
-            pygame.draw.circle(glow_surf, (*color, alpha), (glow_radius, glow_radius), i)
+        colors = self.colors
+        for i in np.flatnonzero(visible):
+            self.draw_glow_circle(surface, colors[i], tuple(xy[i].tolist()), radius=core, glow_radius=glow)
 
+        return light_to_rgba(surface)
 
-        glow_rect = glow_surf.get_rect(center=center)
-        surface.blit(glow_surf, glow_rect, special_flags = pygame.BLEND_ALPHA_SDL2 )
+    def world_points(self): 
+        '''World-space positions (N, 3) and uint8 colors (N, 3) of every star in the galaxy.'''
+        linear, translation = self.transform()
+        return self.local_positions @ linear.T + translation, self.colors
 
-        pygame.draw.circle(surface, color, center, radius)
+    def draw_glow_circle(self, surface, color, center, radius, glow_radius):
+        # one blit of a cached sprite, see astronim.objects.glow
+        draw_glow_circle(surface, color, center, radius, glow_radius)
 
 
     def draw_star(self, obj_pos_2d, color, screen):
         self.draw_glow_circle(screen, color, obj_pos_2d, radius=2, glow_radius=20)
         pygame.draw.circle(screen, color, obj_pos_2d, 2)
 
-    def get_star_color(self): 
-
-        if self.color: 
-            p = np.random.randint(0, 2)
-            if p == 0:
-                return self.color
-
-        r = random.uniform(0, 100)
-        cumulative = 0
-
-        for pct, color in zip(starTypes["percentage"], starTypes["colors"]): 
-            cumulative += pct
-            if r <= cumulative: 
-                return color
-            
-        return starTypes["colors"][np.random.randint(0, len(starTypes["colors"]))]
-
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
         cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
@@ -0,0 +1,104 @@
+import pygame
+import numpy as np
+from collections import OrderedDict
+
+
+class GlowCache:
+    '''Least-recently-used cache of prebuilt glow sprites, shared by every Star, Galaxy and BlackHole.
+
+    A sprite holds the glow rings and the solid core of one (color, radius, glow_radius, width)
+    combination, so drawing a glowing star is a single blit.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Memory cap for all cached sprites together. The least recently used sprites are
+        evicted once it is exceeded.
+    bytes : int
+        Memory currently held by cached sprites.
+    hits : int
+        Number of lookups served from the cache.
+    misses : int
+        Number of lookups that had to build a new sprite.
+    evictions : int
+        Number of sprites dropped to stay under max_bytes.
+
+    Methods
+    -------
+    get(color, radius, glow_radius, width):
+        Returns the sprite for these settings, building it on a miss.
+    clear():
+        Drops every sprite and resets the counters.
+    '''
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.sprites = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        '''Fraction of lookups served from the cache.'''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, color, radius, glow_radius, width = 0):
+        key = (tuple(int(c) for c in color[:3]), int(radius), int(glow_radius), int(width))
+
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = build_glow_sprite(*key)
+        self.sprites[key] = sprite
+        self.bytes += sprite_bytes(sprite)
+
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            _, old = self.sprites.popitem(last=False)
+            self.bytes -= sprite_bytes(old)
+            self.evictions += 1
+
+        return sprite
+
+    def clear(self):
+        self.sprites.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def sprite_bytes(sprite):
+    return sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+
+
+def build_glow_sprite(color, radius, glow_radius, width = 0):
+    '''Draws the glow rings (alpha falling off as exp(-4t)) and the solid core onto one SRCALPHA surface.'''
+    half = max(glow_radius, radius)
+    sprite = pygame.Surface((2 * half + 1, 2 * half + 1), pygame.SRCALPHA)
+    center = (half, half)
+
+    # multiple circles with decreasing alpha for glow
+    rings = np.arange(glow_radius, radius, -1)
+    if len(rings):
+        alphas = (255 * np.exp(-4 * (rings - radius) / (glow_radius - radius))).astype(int)
+        for i, alpha in zip(rings.tolist(), alphas.tolist()):
+            pygame.draw.circle(sprite, (*color, alpha), center, i, width=width)
+
+    pygame.draw.circle(sprite, (*color, 255), center, radius, width=width)
+    return sprite
+
+
+glow_cache = GlowCache()
+
+
+def draw_glow_circle(surface, color, center, radius, glow_radius, width = 0):
+    '''Blits the cached glow sprite for these settings centered on center.'''
+    sprite = glow_cache.get(color, radius, glow_radius, width)
+    glow_rect = sprite.get_rect(center=center)
+    surface.blit(sprite, glow_rect, special_flags = pygame.BLEND_ALPHA_SDL2)
@@ -1,55 +1,115 @@
 import numpy as np
 import pygame
 import math
-from astronim.utils.tools import distance, Vec3, get_2d
-from astronim.utils.constants import DEPTH
-from astronim.objects.line_between import LineBetween
-import time
+from astronim.clock import FrameClock
+from astronim.utils.tools import distance, Vec3, Projection
+from astronim.objects.line_set import LineSet
 
+#largest histogram side for dense plots, 1024 x 1024 int32 cells is 4 MB per Graph
+MAX_GRID = 1024
 
 
 class Graph: 
+    '''Scatter plot drawn on a rectangle in world space. 
+
+    Data lives in growable NumPy buffers with running min/max, so revealing or appending points
+    never rescans the history. Each frame the plot rectangle is projected once and turned into a
+    homography from plot coordinates to the screen. Small plots draw one circle per point; past
+    max_points the samples are binned to the on-screen pixel grid and drawn as a density image,
+    so a million samples cost about as much as a thousand. 
+
+    params
+    ------
+    width_height : tuple
+        World-space width and height of the plot. 
+    x_data, y_data : np.ndarray
+        Samples revealed points_per_second of clock time, starting at start_time. 
+        More can be added with append(). 
+    max_points : int
+        Largest number of points drawn as individual circles. 
+    '''
 
     def __init__(self, width_height:tuple, x_data: np.ndarray, y_data: np.ndarray, 
                  pos:tuple = (0, 0, 0), points_per_second = 30, frame_color = (255, 255, 255), 
-                 point_color = (255, 255, 255)):
+                 point_color = (255, 255, 255), max_points = 2000, start_time = 0.0):
 
         self.width, self.height = width_height
-        self.x_data = x_data
-        self.y_data = y_data
+        self.x_data = np.asarray(x_data, dtype=np.float64)
+        self.y_data = np.asarray(y_data, dtype=np.float64)
         self.pos = Vec3(pos[0], pos[1], pos[2])
         self.base_size = 0.02
         self.box_animation = False
         self.frame_color = frame_color
         self.point_color = point_color
+        self.max_points = max_points
+
+        # revealed samples, buffers grow by doubling
+        self.count = 0
+        self._x = np.empty(max(16, len(self.x_data)))
+        self._y = np.empty(max(16, len(self.y_data)))
+        self.x_min = self.y_min = np.inf
+        self.x_max = self.y_max = -np.inf
 
-        self.current_x_data, self.current_y_data = ([], [])
         self.data_i = 0
-        self.last_time = time.time()
+        self.start_time = start_time
         self.points_per_second = points_per_second
 
-        self.edges = []
+        # pixel-grid histogram of the revealed samples, extended incrementally while bounds and resolution hold
+        self._hist = None
+        self._hist_cells = None
+        self._hist_key = None
+        self._hist_count = 0
+
+        self.homography = None
+        self.edges = None
+
+    @property
+    def current_x_data(self): 
+        return self._x[:self.count]
+
+    @property
+    def current_y_data(self): 
+        return self._y[:self.count]
 
+    def append(self, x, y): 
+        '''Adds one or more samples to the plot.'''
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        n = len(x)
+        if n == 0: 
+            return
+
+        if self.count + n > len(self._x): 
+            capacity = max(2 * len(self._x), self.count + n)
+            self._x = np.resize(self._x, capacity)
+            self._y = np.resize(self._y, capacity)
+
+        self._x[self.count:self.count + n] = x
+        self._y[self.count:self.count + n] = y
+        self.count += n
+
+        self.x_min, self.x_max = min(self.x_min, x.min()), max(self.x_max, x.max())
+        self.y_min, self.y_max = min(self.y_min, y.min()), max(self.y_max, y.max())
+
+    def bounding_sphere(self): 
+        '''World-space center and radius used for frustum culling.'''
+        return [self.pos.x, self.pos.y, self.pos.z], np.hypot(self.width, self.height) / 2
 
     def draw(self, screen): 
         dist = distance(self.pos, Graph.camera)
-        scale = max(0, int(self.base_size * DEPTH / dist))
-        pos_2d = get_2d(self.pos - Graph.camera, Graph.rx, Graph.ry)
+        scale = max(0, int(self.base_size * Graph.projection.depth / dist))
+        pos_2d = Graph.projection.project_point(self.pos)
         if pos_2d:
             self.rect = pygame.Rect(0, 0, self.width*scale, self.height*scale)
             self.rect.center = pos_2d
             
-            if not self.edges:
+            if self.edges is None:
                 self.init_edges()
 
-            for edge in self.edges: 
-                edge.set_camera(Graph.camera, Graph.rx, Graph.ry)
-                edge.draw(screen)
+            self.edges.set_camera(Graph.camera, Graph.rx, Graph.ry, Graph.projection, Graph.clock)
+            self.edges.draw(screen)
 
             self.scatter(screen)
-            # pygame.draw.rect(screen, (255, 255, 255), rect, width = 2)
-            # print(self.rect.left)
-            # print(self.rect.right)
 
         
 
@@ -64,12 +124,63 @@ class Graph:
         self.br = self.pos + Vec3( hw, -hh, 0)  # bottom-right
 
        
-        self.edges = [
-            LineBetween(self.bl, self.tl, animate=True, speed=0.008, color = self.frame_color),
-            LineBetween(self.tl, self.tr, animate=True, speed=0.008, color = self.frame_color),
-            LineBetween(self.tr, self.br, animate=True, speed=0.008, color = self.frame_color),
-            LineBetween(self.br, self.bl, animate=True, speed=0.008, color = self.frame_color),
-        ]
+        # the frame is one chained polyline once it has finished drawing in
+        corners = [[c.x, c.y, c.z] for c in (self.bl, self.tl, self.tr, self.br)]
+        self.edges = LineSet([[0, 1], [1, 2], [2, 3], [3, 0]], points=corners, 
+                             animate=True, speed=0.008, color = self.frame_color, 
+                             start_frame = round(self.start_time * Graph.clock.fps))
+
+    def plot_corners(self, margin = 0.1): 
+        '''World positions of the usable plot area's corners, in the order (0,0), (1,0), (1,1), (0,1) of plot coordinates.'''
+        hw = self.width * (1 - 2*margin) / 2
+        hh = self.height * (1 - 2*margin) / 2
+        x, y, z = self.pos.x, self.pos.y, self.pos.z
+        return np.array([[x - hw, y - hh, z], [x + hw, y - hh, z], [x + hw, y + hh, z], [x - hw, y + hh, z]])
+
+    def update_homography(self, margin = 0.1): 
+        '''
+        Projects the plot rectangle once and fits the homography that maps plot coordinates 
+        (u, v in [0, 1]) to the screen. The plot is planar, so this is exact. 
+        Left as None when part of the rectangle is behind the camera. 
+        '''
+        self.corners = self.plot_corners(margin)
+        xy, visible, _ = Graph.projection.project(self.corners)
+        if not visible.all(): 
+            self.homography = None
+            return
+
+        # screen corners of the same rectangle, used to pick the pixel grid resolution
+        self.screen_corners = xy
+        uv = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float64)
+        A = np.zeros((8, 8))
+        b = xy.reshape(-1)
+        for i, ((u, v), (x, y)) in enumerate(zip(uv, xy)): 
+            A[2*i] = [u, v, 1, 0, 0, 0, -u*x, -v*x]
+            A[2*i + 1] = [0, 0, 0, u, v, 1, -u*y, -v*y]
+        self.homography = np.append(np.linalg.solve(A, b), 1).reshape(3, 3)
+
+    def plot_to_screen(self, u, v): 
+        '''Maps plot coordinates to screen positions, returns (xy, visible) like Projection.project.'''
+        if self.homography is not None: 
+            H = self.homography
+            w = H[2, 0]*u + H[2, 1]*v + H[2, 2]
+            x = (H[0, 0]*u + H[0, 1]*v + H[0, 2]) / w
+            y = (H[1, 0]*u + H[1, 1]*v + H[1, 2]) / w
+            return np.column_stack([x, y]).astype(int), np.ones(len(u), dtype=bool)
+
+        c = self.corners
+        points_3d = c[0] + np.outer(u, c[1] - c[0]) + np.outer(v, c[3] - c[0])
+        xy, visible, _ = Graph.projection.project(points_3d)
+        return xy, visible
+
+    def normalized(self, start = 0, stop = None): 
+        '''Revealed samples start:stop in plot coordinates (u, v in [0, 1]).'''
+        # do not want to divide by zero
+        x_range = self.x_max - self.x_min if self.x_max != self.x_min else 1
+        y_range = self.y_max - self.y_min if self.y_max != self.y_min else 1
+        u = (self._x[start:stop if stop is not None else self.count] - self.x_min) / x_range
+        v = (self._y[start:stop if stop is not None else self.count] - self.y_min) / y_range
+        return u, v
 
     def scatter(self, screen, margin = 0.1):
          
@@ -77,54 +188,102 @@ class Graph:
         if not hasattr(self, "bl") or not hasattr(self, "tl"):
             return  # edges not initialized yet
         
-        if isinstance(self.current_x_data, np.ndarray):
-            self.current_x_data = self.current_x_data.tolist()
-        if isinstance(self.current_y_data, np.ndarray):
-            self.current_y_data = self.current_y_data.tolist()
+        if self.count == 0: 
+            return
 
-        if self.current_x_data and self.current_y_data:
-        
-            x_min, x_max = np.min(self.current_x_data), np.max(self.current_x_data)
-            y_min, y_max = np.min(self.current_y_data), np.max(self.current_y_data)
+        self.update_homography(margin)
+
+        if self.count <= self.max_points: 
+            xy, visible = self.plot_to_screen(*self.normalized())
+            for point_2d in xy[visible].tolist():
+                pygame.draw.circle(screen, self.point_color, point_2d, 3)
+        else: 
+            self.draw_density(screen)
 
-            # do not want to divide by zero
-            x_range = x_max - x_min if x_max != x_min else 1
-            y_range = y_max - y_min if y_max != y_min else 1
+    def grid_size(self): 
+        '''Histogram resolution: the plot's on-screen size rounded up to a power of two, so zooming rarely rebins.'''
+        if self.homography is None: 
+            return 256, 256
+        c = self.screen_corners
+        w = max(np.hypot(*(c[1] - c[0])), np.hypot(*(c[2] - c[3])))
+        h = max(np.hypot(*(c[3] - c[0])), np.hypot(*(c[2] - c[1])))
+        return tuple(int(min(MAX_GRID, 2 ** math.ceil(math.log2(max(2, s))))) for s in (w, h))
 
-            usable_width = self.width * (1 - 2*margin)
-            usable_height = self.height * (1 - 2*margin)
+    def histogram(self): 
+        '''
+        Sample counts on a flat (bx * by) grid over the data bounds, and the indices of the occupied 
+        cells. Only samples added since the last call are binned, so a frame costs the new samples, 
+        not the grid. 
+        '''
+        bx, by = self.grid_size()
+        key = (self.x_min, self.x_max, self.y_min, self.y_max, bx, by)
+        if key != self._hist_key or self._hist_count > self.count: 
+            self._hist = np.zeros(bx * by, dtype=np.int32)
+            self._hist_cells = np.zeros(0, dtype=np.int64)
+            self._hist_key = key
+            self._hist_count = 0
 
-            for x, y in zip(self.current_x_data, self.current_y_data):
-                # Normalize into [-hw, hw], [-hh, hh]
-                x_norm = ((x - x_min) / x_range) * usable_width - usable_width/2
-                y_norm = ((y - y_min) / y_range) * usable_height - usable_height/2
+        if self._hist_count < self.count: 
+            u, v = self.normalized(self._hist_count)
+            i = np.minimum((u * bx).astype(np.int64), bx - 1)
+            j = np.minimum((v * by).astype(np.int64), by - 1)
+            cells, counts = np.unique(i * by + j, return_counts=True)
+            self._hist_cells = np.concatenate([self._hist_cells, cells[self._hist[cells] == 0]])
+            self._hist[cells] += counts.astype(np.int32)
+            self._hist_count = self.count
 
-                # Get 3D position inside box
-                point_3d = self.pos + Vec3(x_norm, y_norm, 0)
+        return self._hist, self._hist_cells, bx, by
 
-                # Project into 2D
-                point_2d = get_2d(point_3d - Graph.camera, Graph.rx, Graph.ry)
-                if point_2d:
-                    pygame.draw.circle(screen, self.point_color, point_2d, 3)
+    def draw_density(self, screen): 
+        '''Draws the binned samples as one image, brightness growing with log(count) per pixel.'''
+        hist, cells, bx, by = self.histogram()
+        i, j = np.divmod(cells, by)
+        xy, visible = self.plot_to_screen((i + 0.5) / bx, (j + 0.5) / by)
+
+        W, H = screen.get_size()
+        inside = visible & (xy[:, 0] >= 0) & (xy[:, 0] < W) & (xy[:, 1] >= 0) & (xy[:, 1] < H)
+        if not inside.any(): 
+            return
+        xy, counts = xy[inside], hist[cells[inside]]
+
+        # aggregate cells that land on the same pixel, inside the bounding box of the plot
+        x0, y0 = xy.min(axis=0)
+        w, h = xy.max(axis=0) - (x0, y0) + 1
+        density = np.bincount((xy[:, 0] - x0) * h + (xy[:, 1] - y0), weights=counts, minlength=w * h).reshape(w, h)
+
+        brightness = np.log1p(density) / np.log1p(density.max())
+        image = pygame.Surface((w, h))
+        pygame.surfarray.blit_array(image, (brightness[..., None] * self.point_color).astype(np.uint8))
+        screen.blit(image, (x0, y0), special_flags = pygame.BLEND_ADD)
 
     def update_data_animation(self):
-        now = time.time()
-        dt = now - self.last_time
-        points_to_add = int(dt * self.points_per_second)
+        '''Reveals the samples due by the current clock time.'''
+        elapsed = Graph.clock.time - self.start_time
+        stop = min(max(0, int(elapsed * self.points_per_second)), len(self.x_data))
 
-        if points_to_add > 0:
-            self.last_time = now
-            for _ in range(points_to_add):
-                if self.data_i < len(self.x_data):
-                    self.current_x_data.append(self.x_data[self.data_i])
-                    self.current_y_data.append(self.y_data[self.data_i])
-                    self.data_i += 1
+        if stop < self.data_i: 
+            # the clock went back (a seek), start over
+            self.reset()
+
+        if stop > self.data_i:
+            self.append(self.x_data[self.data_i:stop], self.y_data[self.data_i:stop])
+            self.data_i = stop
+
+    def reset(self): 
+        '''Drops every revealed or appended sample.'''
+        self.count = 0
+        self.data_i = 0
+        self.x_min = self.y_min = np.inf
+        self.x_max = self.y_max = -np.inf
+        self._hist_key = None
 
 
 
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
-        cls.ry = ry
\ No newline at end of file
+        cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
\ No newline at end of file
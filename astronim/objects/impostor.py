@@ -0,0 +1,161 @@
+import weakref
+import pygame
+import numpy as np
+from collections import OrderedDict
+
+
+class Billboard:
+    '''One cached offscreen rendering of a galaxy.
+
+    Attributes
+    ----------
+    surface : pygame.Surface
+        The galaxy rendered at the size it had when the billboard was made (SRCALPHA).
+    orientation : np.ndarray
+        The galaxy's camera-space orientation (3x3, scale removed) at render time.
+    direction : np.ndarray
+        Unit vector from the camera to the galaxy at render time, in world space.
+    apparent : float
+        Apparent galaxy radius in pixels at render time.
+    scaled : pygame.Surface
+        The surface resized to the most recent apparent size, reused while that size holds.
+    '''
+    def __init__(self, surface, orientation, direction, apparent):
+        self.surface = surface
+        self.orientation = orientation
+        self.direction = direction
+        self.apparent = apparent
+        self.scaled = surface
+
+    @property
+    def bytes(self):
+        size = self.surface.get_width() * self.surface.get_height() * 4
+        if self.scaled is not self.surface:
+            size += self.scaled.get_width() * self.scaled.get_height() * 4
+        return size
+
+
+class ImpostorCache:
+    '''Least-recently-used billboards for distant galaxies, with one memory budget for the whole scene.
+
+    A galaxy's billboard is reused (scaled to the current apparent size) until its camera-space
+    orientation turns or the direction it is seen from changes by more than angle_tolerance, or
+    its apparent size changes by more than size_tolerance, then it is rendered again.
+
+    Billboards are keyed by id() of the galaxy and dropped when the galaxy is garbage collected,
+    so the cache never keeps a galaxy alive.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Memory budget for all billboards. The least recently drawn galaxies are evicted first.
+    angle_tolerance : float
+        Largest change in viewing angle, in radians, before re-rendering.
+    size_tolerance : float
+        Largest relative change in apparent size before re-rendering.
+    hits, misses, evictions : int
+        Counters for reused billboards, re-renders and billboards dropped to stay in budget.
+
+    Methods
+    -------
+    get(owner, orientation, direction, apparent, render):
+        Returns a surface for the current view, calling render() when the cached one is stale.
+    '''
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, angle_tolerance: float = 0.03, size_tolerance: float = 0.15):
+        self.max_bytes = max_bytes
+        self.angle_tolerance = angle_tolerance
+        self.size_tolerance = size_tolerance
+        self.billboards = OrderedDict()
+        self.finalizers = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, owner, orientation, direction, apparent, render):
+        '''
+        params
+        ------
+        owner : object
+            The galaxy the billboard belongs to. Only a weak reference is kept.
+        orientation : np.ndarray
+            Current camera-space orientation of the galaxy (3x3 rotation).
+        direction : np.ndarray
+            Current unit vector from the camera to the galaxy.
+        apparent : float
+            Current apparent radius in pixels.
+        render : callable
+            Returns a freshly rendered SRCALPHA surface for the current view.
+
+        returns
+        -------
+        pygame.Surface sized for the current apparent radius.
+        '''
+        key = id(owner)
+        if key not in self.finalizers:
+            self.finalizers[key] = weakref.finalize(owner, self.discard, key)
+
+        billboard = self.billboards.pop(key, None)
+        if billboard is not None:
+            self.bytes -= billboard.bytes
+
+        if billboard is None or self.stale(billboard, orientation, direction, apparent):
+            self.misses += 1
+            billboard = Billboard(render(), orientation, direction, apparent)
+        else:
+            self.hits += 1
+            ratio = apparent / billboard.apparent
+            w, h = billboard.surface.get_size()
+            size = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+            if billboard.scaled.get_size() != size:
+                billboard.scaled = pygame.transform.smoothscale(billboard.surface, size)
+
+        self.billboards[key] = billboard
+        self.bytes += billboard.bytes
+
+        while self.bytes > self.max_bytes and len(self.billboards) > 1:
+            _, old = self.billboards.popitem(last=False)
+            self.bytes -= old.bytes
+            self.evictions += 1
+
+        return billboard.scaled
+
+    def stale(self, billboard, orientation, direction, apparent):
+        # for small rotations the largest entry change approximates the angle turned
+        turned = np.abs(orientation - billboard.orientation).max()
+        # a sideways camera move keeps the orientation but looks at the galaxy from a new side
+        moved = np.arccos(np.clip(np.dot(direction, billboard.direction), -1.0, 1.0))
+        resized = abs(apparent / billboard.apparent - 1)
+        return max(turned, moved) > self.angle_tolerance or resized > self.size_tolerance
+
+    def discard(self, key):
+        '''Drops the billboard stored under key, id() of its galaxy.'''
+        self.finalizers.pop(key, None)
+        billboard = self.billboards.pop(key, None)
+        if billboard is not None:
+            self.bytes -= billboard.bytes
+
+    def clear(self):
+        for finalizer in self.finalizers.values():
+            finalizer.detach()
+        self.finalizers.clear()
+        self.billboards.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def light_to_rgba(surface):
+    '''Turns light drawn over black into an SRCALPHA surface that alpha-blends to the same image over black.'''
+    light = pygame.surfarray.array3d(surface).astype(np.float32)
+    alpha = light.max(axis=2)
+    color = light * (255 / np.maximum(alpha, 1))[..., None]
+
+    rgba = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    pygame.surfarray.pixels3d(rgba)[...] = color.astype(np.uint8)
+    pygame.surfarray.pixels_alpha(rgba)[...] = alpha.astype(np.uint8)
+    return rgba
+
+
+impostor_cache = ImpostorCache()
@@ -1,10 +1,10 @@
 import pygame 
 import numpy as np
-from astronim.utils.tools import get_2d, Vec3, distance
-from astronim.utils.constants import DEPTH
+from astronim.clock import FrameClock
+from astronim.utils.tools import Vec3, distance, Projection
 
 class LineBetween: 
-    def __init__(self, obj1, obj2, color = (255, 255, 255), width: int= 2, animate: bool = False, speed: float = 0.01):
+    def __init__(self, obj1, obj2, color = (255, 255, 255), width: int= 2, animate: bool = False, speed: float = 0.01, start_frame: int = 0):
 
         self.obj1 = obj1
         self.obj2 = obj2
@@ -13,16 +13,32 @@ class LineBetween:
         self.width = width
         self.animate = animate
         self.speed = speed
+        self.start_frame = start_frame
         self.progress = 0 if self.animate else 1
 
+    @property
+    def pos(self): 
+        '''Midpoint of the line, used for depth sorting.'''
+        ends = []
+        for obj in (self.obj1, self.obj2): 
+            if isinstance(obj, tuple): 
+                ends.append(Vec3(*obj[:3]))
+            elif isinstance(obj, Vec3): 
+                ends.append(obj)
+            else: 
+                ends.append(obj.pos)
+        return Vec3((ends[0].x + ends[1].x) / 2, (ends[0].y + ends[1].y) / 2, (ends[0].z + ends[1].z) / 2)
+
     def draw(self, screen): 
 
         start, end = self.init_start_end()
 
         if start and end: 
 
-            if self.progress < 1: 
-                self.progress = min(1, self.progress + self.speed)
+            if self.animate: 
+                # speed is progress per frame of the clock, so the line grows the same at any render speed
+                elapsed = LineBetween.clock.frame - self.start_frame + 1
+                self.progress = max(0, min(1, elapsed * self.speed))
 
             start_x, start_y = start
             end_x, end_y = end
@@ -37,20 +53,19 @@ class LineBetween:
         Checks valid types for start amd end variables. Line should accept a tuple, an object, or a vec3
         '''
 
-        if isinstance(self.obj1, tuple): 
-            start = get_2d(Vec3(self.obj1[0], self.obj1[1], self.obj1[2]) - LineBetween.camera, LineBetween.rx, LineBetween.ry)
-        elif isinstance(self.obj1, Vec3): 
-            start = get_2d(self.obj1 - LineBetween.camera, LineBetween.rx, LineBetween.ry)
-        else: 
-            start = get_2d(self.obj1.pos - LineBetween.camera, LineBetween.rx, LineBetween.ry)
-
-            
-        if isinstance(self.obj2, tuple): 
-            end = get_2d(Vec3(self.obj2[0], self.obj2[1], self.obj2[2]) - LineBetween.camera, LineBetween.rx, LineBetween.ry)
-        elif isinstance(self.obj2, Vec3): 
-            end = get_2d(self.obj2 - LineBetween.camera, LineBetween.rx, LineBetween.ry)
-        else: 
-            end = get_2d(self.obj2.pos - LineBetween.camera, LineBetween.rx, LineBetween.ry)
+        points = []
+        for obj in (self.obj1, self.obj2): 
+            if isinstance(obj, tuple): 
+                points.append(obj[:3])
+            elif isinstance(obj, Vec3): 
+                points.append([obj.x, obj.y, obj.z])
+            else: 
+                points.append([obj.pos.x, obj.pos.y, obj.pos.z])
+
+        # both endpoints go through the projection together
+        xy, visible, _ = LineBetween.projection.project(points)
+        start = tuple(xy[0].tolist()) if visible[0] else None
+        end = tuple(xy[1].tolist()) if visible[1] else None
 
         return (start, end)
 
@@ -64,8 +79,10 @@ class LineBetween:
 
 
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
-        cls.ry = ry
\ No newline at end of file
+        cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
\ No newline at end of file
@@ -0,0 +1,162 @@
+import pygame
+import numpy as np
+from astronim.clock import FrameClock
+from astronim.utils.tools import Vec3, Projection
+
+
+class LineSet:
+    '''Many straight lines drawn as one object, for constellations and networks between bodies.
+
+    Lines are index pairs into one table of endpoints: either the simulation's body positions
+    (so lines follow the bodies) or a fixed (K, 3) array of points. Every endpoint is projected
+    in one call per frame, and lines that meet end to start are chained into polylines at
+    construction, so a connected figure costs one pygame call instead of one per line.
+
+    params
+    ------
+    pairs : array-like
+        (M, 2) integer endpoint indices, one row per line.
+    points : array-like, optional
+        (K, 3) fixed world-space endpoints.
+    simulation : Simulation, optional
+        Endpoints are simulation.star_positions, indexed by each body's index.
+        Exactly one of points and simulation must be given.
+    color : tuple
+        Color of every line.
+    width : int
+        Line width in pixels.
+    animate : bool
+        Grow every line from its start to its end.
+    speed : float or array-like
+        Progress added per frame while animating, for all lines or one value per line.
+    start_frame : int or array-like
+        Clock frame at which the lines start growing, for all lines or one value per line.
+
+    Attributes
+    ----------
+    progress : np.ndarray
+        (M,) fraction of each line drawn, 1 once it is complete. Set from the frame clock on every draw.
+    '''
+    def __init__(self, pairs, points = None, simulation = None, color = (255, 255, 255), width: int = 2,
+                 animate: bool = False, speed = 0.01, start_frame = 0):
+
+        if (points is None) == (simulation is None):
+            raise ValueError("LineSet needs exactly one of points or simulation for its endpoints")
+
+        self.pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        # only the referenced endpoints are projected, pairs index into them through local_pairs
+        self.used, inverse = np.unique(self.pairs, return_inverse=True)
+        self.local_pairs = inverse.reshape(-1, 2)
+        self.points = None if points is None else np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.simulation = simulation
+
+        self.color = color
+        self.width = width
+        self.animate = animate
+        self.speed = np.broadcast_to(np.asarray(speed, dtype=np.float64), len(self.pairs))
+        self.start_frame = np.broadcast_to(np.asarray(start_frame, dtype=np.int64), len(self.pairs))
+        self.progress = np.full(len(self.pairs), 0.0 if animate else 1.0)
+
+        self.chain_lines()
+
+    def chain_lines(self):
+        '''
+        Orders and orients the lines so that consecutive ones share an endpoint wherever possible.
+        Walks start at odd-degree endpoints, which gives the fewest chains for each connected figure.
+        '''
+        edges = {}
+        for line, (a, b) in enumerate(self.pairs.tolist()):
+            edges.setdefault(a, []).append((line, b))
+            edges.setdefault(b, []).append((line, a))
+
+        used = np.zeros(len(self.pairs), dtype=bool)
+        order, flipped, starts = [], [], []
+        for node in sorted(edges, key = lambda n: len(edges[n]) % 2 == 0):
+            while edges[node]:
+                starts.append(len(order))
+                current = node
+                while edges[current]:
+                    line, other = edges[current].pop()
+                    if used[line]:
+                        continue
+                    used[line] = True
+                    order.append(line)
+                    flipped.append(self.pairs[line, 0] != current)
+                    current = other
+
+        # the inner loop can exhaust a node without taking a line, leaving an empty chain
+        self.order = np.array(order, dtype=np.int64)
+        self.flipped = np.array(flipped, dtype=bool)
+        self.chain_start = np.zeros(len(order), dtype=bool)
+        self.chain_start[[s for s in starts if s < len(order)]] = True
+
+    def endpoints(self):
+        '''(K, 3) world-space endpoint table for this frame.'''
+        if self.points is not None:
+            return self.points
+        return self.simulation.star_positions
+
+    def bounding_sphere(self):
+        '''World-space center and radius used for frustum culling.'''
+        ends = self.endpoints()[self.used] if len(self.used) else np.zeros((1, 3))
+        low, high = ends.min(axis=0), ends.max(axis=0)
+        return (low + high) / 2, np.linalg.norm(high - low) / 2
+
+    @property
+    def pos(self):
+        '''Center of the lines, used for depth sorting.'''
+        center, _ = self.bounding_sphere()
+        return Vec3(*center.tolist())
+
+    def draw(self, screen):
+        if not len(self.order):
+            return
+
+        xy, visible, _ = LineSet.projection.project(self.endpoints()[self.used])
+
+        # lines in chain order, each oriented to start where the previous one ended
+        pairs = self.local_pairs[self.order]
+        pairs[self.flipped] = pairs[self.flipped, ::-1]
+        drawn = visible[pairs[:, 0]] & visible[pairs[:, 1]]
+
+        if self.animate:
+            # a pure function of the frame, so any frame renders the same on its own
+            elapsed = LineSet.clock.frame - self.start_frame + 1
+            self.progress = np.clip(elapsed * self.speed, 0, 1)
+
+        start = xy[pairs[:, 0]].astype(np.float64)
+        end = xy[pairs[:, 1]].astype(np.float64)
+
+        # flipped lines are drawn from their far end, so they grow from the other side
+        # unless they are complete; partial lines are drawn on their own in their own direction
+        progress = self.progress[self.order]
+        partial = progress < 1
+        original = np.where(self.flipped[:, None], end, start)
+        target = np.where(self.flipped[:, None], start, end)
+        start = np.where(partial[:, None], original, start)
+        end = np.where(partial[:, None], original + (target - original) * progress[:, None], end)
+
+        # a line continues the previous polyline when both are drawn in full and they are chained
+        full = drawn & ~partial
+        joined = ~self.chain_start & full & np.roll(full, 1)
+        joined[0] = False
+
+        lines = np.flatnonzero(drawn)
+        if not len(lines):
+            return
+        new_run = ~joined[lines]
+
+        # each run is its first line's start followed by the end of every line in it
+        points = np.insert(end[lines], np.flatnonzero(new_run), start[lines[new_run]], axis=0)
+        run_starts = np.flatnonzero(new_run) + np.arange(new_run.sum())
+        for run in np.split(points, run_starts[1:]):
+            pygame.draw.lines(screen, self.color, False, run.tolist(), width = self.width)
+
+    @classmethod
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
+        """Called in main_loop in astronim"""
+        cls.camera = camera
+        cls.rx = rx
+        cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
@@ -1,6 +1,9 @@
 import pygame 
 import numpy as np
-from astronim.utils.tools import distance, get_2d, Vec3
+from astronim.clock import FrameClock
+from astronim.utils.tools import distance, Vec3, Projection
+from .glow import draw_glow_circle
+from .trail import draw_trail
 
 class Star:
     def __init__(self, pos:Vec3, vel: Vec3, mass: float, radius: float = 0.01, color = (255, 255, 255), trail = False):
@@ -9,27 +12,20 @@ class Star:
         self.mass = mass
         self.base_radius = radius
         self.color = color
-        self.trail_list = []
+        self.trail_row = None # row in Simulation.trail_buffer, set by the simulation
         self.trail_length = 50
+        self.trail_fade = 0 # number of dimming bands towards the tail, 0 for a solid trail
         self.trail = trail
 
         
 
-    def draw_glow_circle(self, surface, color, center, radius, glow_radius):
-        
-        glow_surf = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-
-        # multiple circles with decreasing alpha for glow
-        for i in np.arange(glow_radius, radius, -1):
-            t =  (i - radius) / (glow_radius - radius)
-            alpha = int(255 * np.exp(-4 * t))
-            pygame.draw.circle(glow_surf, (*color, alpha), (glow_radius, glow_radius), i)
-
+    def bounding_sphere(self): 
+        '''World-space center and radius used for frustum culling.'''
+        return [self.pos.x, self.pos.y, self.pos.z], 0.0
 
-        glow_rect = glow_surf.get_rect(center=center)
-        surface.blit(glow_surf, glow_rect, special_flags = pygame.BLEND_ALPHA_SDL2 )
-
-        pygame.draw.circle(surface, color, center, radius)
+    def draw_glow_circle(self, surface, color, center, radius, glow_radius):
+        # one blit of a cached sprite, see astronim.objects.glow
+        draw_glow_circle(surface, color, center, radius, glow_radius)
 
 
 
@@ -38,10 +34,10 @@ class Star:
 
         
 
-        obj_pos_2d = get_2d(self.pos - Star.camera, Star.rx, Star.ry)
+        obj_pos_2d = Star.projection.project_point(self.pos)
         if obj_pos_2d:
             dist = distance(self.pos, Star.camera)
-            self.radius = max(2, min(20, int(self.base_radius * 500 / dist)))
+            self.radius = max(2, min(int(20 * Star.projection.pixel_scale), int(self.base_radius * Star.projection.depth / dist)))
 
             self.draw_glow_circle(
                 screen, self.color, obj_pos_2d,
@@ -50,19 +46,18 @@ class Star:
             )
             pygame.draw.circle(screen, self.color, obj_pos_2d, 0.01)
 
-    def draw_trail(self, screen): 
-        obj_path_2d = [
-                pt for pt in (get_2d(Vec3(*p) - Star.camera, Star.rx, Star.ry) for p in self.trail_list) if pt ]
-        
-        if len(obj_path_2d) >1:
-            pygame.draw.lines(screen, (255, 255, 255), False, obj_path_2d, 1)
+    def draw_trail(self, screen, obj_path_2d): 
+        '''Draws the trail through already projected (and simplified) points, see Renderer.trail_path.'''
+        draw_trail(screen, obj_path_2d, fade=self.trail_fade)
 
 
 
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
         cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
 
@@ -1,8 +1,77 @@
 import pygame
-from astronim.utils.tools import distance, get_2d, Vec3
-from astronim.utils.constants import DEPTH, WIDTH, HEIGHT
+import math
+from functools import lru_cache
+from collections import OrderedDict
+from astronim.clock import FrameClock
+from astronim.utils.tools import distance, Vec3, Projection
 import time
 
+FONT_FAMILY = 'Times New Roman'
+
+#font sizes are rounded to powers of SIZE_STEP so zooming doesn't load a new font every frame
+SIZE_STEP = 1.08
+
+#rendered strings kept by TEXT_CACHE
+MAX_RENDERED = 256
+
+
+def quantize_size(size): 
+    '''Rounds a font size to the nearest power of SIZE_STEP.'''
+    return max(2, int(round(SIZE_STEP ** round(math.log(size, SIZE_STEP)))))
+
+
+@lru_cache(maxsize=128)
+def get_font(family, size): 
+    '''Loads a system font once per (family, size).'''
+    return pygame.font.SysFont(family, size)
+
+
+def clear_font_cache(): 
+    '''Drops every cached font and rendered string. Fonts die with pygame.quit(), so call this after pygame.init().'''
+    get_font.cache_clear()
+    TEXT_CACHE.clear()
+
+
+class TextCache: 
+    '''Least-recently-used rendered text surfaces keyed by (message, size, color). 
+
+    Attributes
+    ----------
+    max_entries : int
+        Number of surfaces kept. 
+    hits, misses : int
+        Lookups served from the cache and lookups that had to render. 
+    '''
+    def __init__(self, max_entries: int = MAX_RENDERED): 
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, message, size, color, family = FONT_FAMILY): 
+        key = (message, size, tuple(color), family)
+        surface = self.surfaces.get(key)
+        if surface is not None: 
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = get_font(family, size).render(message, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries: 
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self): 
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+TEXT_CACHE = TextCache()
+
+
 class Text: 
     def __init__(self, message: str, pos: Vec3 =  Vec3(0, 0, 50), base_size: int = 32, color = (255, 255, 255), type_out = False, start_time = 0, char_delay = 50): 
         self.pos = pos
@@ -15,39 +84,46 @@ class Text:
         self.char_delay = char_delay
         self.start_time = start_time
 
+        # the last typed-out prefix: (size, text, surface)
+        self.typed = None
+
     def draw(self, screen): 
+        text_pos = Text.projection.project_point(self.pos)
+        if not text_pos: 
+            return
+
         dist = distance(self.pos, Text.camera)
-        size = max(2, min(5000, int(self.base_size * DEPTH / dist)))
-        font = pygame.font.SysFont('Times New Roman', size)
+        size = quantize_size(max(2, min(5000, int(self.base_size * Text.projection.depth / dist))))
 
         if self.type_out: 
             self.update_message()
-            text_surface = font.render(self.current_message, True, self.color)
+            text_surface = self.render_typed(size)
         else:
-            text_surface = font.render(self.message, True, self.color)
+            text_surface = TEXT_CACHE.render(self.message, size, self.color)
 
         textRect = text_surface.get_rect()
-        # textRect.center = (WIDTH //2, HEIGHT//2)
-        textRect.center = (3840 //2, 2160//2)
-        #Change width and heigth back!!!!
-
-        text_pos = get_2d(self.pos - Text.camera, Text.rx, Text.ry)
-
-        if text_pos: 
-            textRect.center = text_pos
-            screen.blit(text_surface, textRect)
+        textRect.center = text_pos
+        screen.blit(text_surface, textRect)
+
+    def render_typed(self, size): 
+        '''
+        Renders current_message as one string, so kerning matches the finished text. The surface 
+        is kept until the prefix or size changes, and the prefixes stay out of TEXT_CACHE. 
+        '''
+        key = (size, self.current_message)
+        if self.typed is None or self.typed[:2] != key: 
+            self.typed = (*key, get_font(FONT_FAMILY, size).render(self.current_message, True, self.color))
+        return self.typed[2]
 
     def update_message(self):
 
-        elapsed = pygame.time.get_ticks() - self.start_time
+        # start_time and char_delay are in milliseconds of clock time
+        elapsed = Text.clock.milliseconds - self.start_time
         
 
-        chars_to_show = elapsed // self.char_delay
+        chars_to_show = max(0, int(elapsed // self.char_delay))
 
         self.current_message = self.message[:chars_to_show]
-
-        if chars_to_show >= len(self.message): 
-            self.type_out = False
         
 
 
@@ -61,8 +137,10 @@ class Text:
 
 
     @classmethod
-    def set_camera(cls, camera, rx, ry):
+    def set_camera(cls, camera, rx, ry, projection = None, clock = None):
         """Called in main_loop in astronim"""
         cls.camera = camera
         cls.rx = rx
-        cls.ry = ry
\ No newline at end of file
+        cls.ry = ry
+        cls.projection = projection if projection is not None else Projection(camera, rx, ry)
+        cls.clock = clock if clock is not None else FrameClock()
\ No newline at end of file
@@ -0,0 +1,35 @@
+import pygame
+import numpy as np
+
+
+def draw_trail(screen, path_2d, color = (255, 255, 255), width = 1, fade = 0):
+    '''Draws a projected trail, optionally fading out towards its tail.
+
+    params
+    ------
+    screen : pygame.Surface
+        The surface to draw on.
+    path_2d : np.ndarray
+        (M, 2) screen points, oldest first.
+    color : tuple
+        Color of the newest end of the trail.
+    width : int
+        Line width in pixels.
+    fade : int
+        Number of bands the trail is split into, each dimmer towards the tail. 0 draws one solid line.
+    '''
+    if len(path_2d) < 2:
+        return
+
+    if not fade:
+        pygame.draw.lines(screen, color, False, np.asarray(path_2d).tolist(), width)
+        return
+
+    # one pygame call per band, bands share their end points so the line stays connected
+    bounds = np.linspace(0, len(path_2d) - 1, min(fade, len(path_2d) - 1) + 1).astype(int)
+    for k, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        brightness = (k + 1) / (len(bounds) - 1)
+        band_color = tuple(int(c * brightness) for c in color)
+        band = np.asarray(path_2d[start:stop + 1]).tolist()
+        if len(band) > 1:
+            pygame.draw.lines(screen, band_color, False, band, width)
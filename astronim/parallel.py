@@ -0,0 +1,256 @@
+import os
+import json
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from dataclasses import asdict, replace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from astronim.renderer import Renderer
+from astronim.recorder import Recorder, OutputSpec, output_files
+from astronim.clock import FrameClock
+from astronim.objects.text import clear_font_cache
+from astronim.utils.tools import Vec3
+
+
+class CameraTrack:
+    '''A camera path stored frame by frame, so it pickles for worker processes.
+
+    Attributes
+    ----------
+    positions : np.ndarray
+        (frames, 3) camera position of every frame.
+    rx, ry : np.ndarray
+        (frames,) camera rotation of every frame.
+
+    Methods
+    -------
+    record(camera, rx, ry, frames, camera_function):
+        Builds the track a Renderer would follow in main_loop.
+    '''
+    def __init__(self, positions, rx, ry):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.rx = np.broadcast_to(np.asarray(rx, dtype=np.float64), len(self.positions))
+        self.ry = np.broadcast_to(np.asarray(ry, dtype=np.float64), len(self.positions))
+
+    @classmethod
+    def record(cls, camera, rx, ry, frames, camera_function = None):
+        '''
+        params
+        ------
+        camera : Vec3
+            Camera position at frame 0. It is copied, not moved.
+        rx, ry : float
+            Camera rotation, fixed for the whole track.
+        frames : int
+            Length of the track.
+        camera_function : callable, optional
+            The renderer's camera animation, applied to the camera once after every frame as
+            Renderer.draw does.
+        '''
+        camera = Vec3(camera.x, camera.y, camera.z)
+        positions = np.zeros((frames, 3))
+        for frame in range(frames):
+            positions[frame] = camera.x, camera.y, camera.z
+            if camera_function is not None:
+                camera_function(camera)
+        return cls(positions, rx, ry)
+
+    def __call__(self, frame):
+        return Vec3(*self.positions[frame].tolist()), float(self.rx[frame]), float(self.ry[frame])
+
+
+def render_parallel(simulation, frames, dt, width, height, output_file = "output.mp4", camera_path = None,
+                    workers = None, fps = 60, focal_length = None, renderer = Renderer, frames_dir = None,
+                    outputs = None, segment_frames = None, segment_dir = None):
+    '''Renders a scene offline with one process per slice of the frame range.
+
+    -The simulation is run ahead once and its trajectory stored in a memory-mapped .npy file.
+    -Each worker unpickles its own copy of the scene, runs a headless renderer over a contiguous
+     block of frames (loading bodies and trails from the trajectory) and encodes them into a segment.
+    -The Recorder stream-copies the segments of every output into place in order.
+
+    Every frame only depends on the trajectory, the camera path and the frame clock. Workers also
+    drop the caches that carry work between frames (galaxy billboards, the incremental depth sort)
+    before each frame, so the video is the same whatever the number of workers or blocks. A
+    sequential main_loop reuses billboards while they are within tolerance, so distant galaxies
+    can differ from it by a few pixels.
+
+    params
+    ------
+    simulation : Simulation
+        The scene at its initial state. It is pickled for the workers, so it should not have been
+        drawn yet. It is not modified.
+    frames : int
+        Number of frames to render.
+    dt : float
+        Simulated seconds per frame.
+    width, height : int
+        Size of the video.
+    output_file : str
+        The video to write, for outputs that don't name their own file (see output_files).
+    camera_path : callable, optional
+        camera_path(frame) returns (camera, rx, ry) for a frame, with camera a Vec3. It has to be
+        picklable, a CameraTrack or a module-level function. Defaults to a fixed camera at the origin.
+    workers : int, optional
+        Number of processes, defaults to the number of CPUs.
+    fps : float
+        Frame rate of the video and of the frame clock.
+    focal_length : float, optional
+        Passed on to the renderer, see Renderer.
+    renderer : type
+        Renderer class the workers draw with, for example SplatRenderer.
+    frames_dir : str, optional
+        Save every frame as frame_%05d.png in this directory instead of encoding a video.
+    outputs : list of OutputSpec, optional
+        The videos to produce, see Recorder. Defaults to one video at the rendered size.
+    segment_frames : int, optional
+        Frames per block. Defaults to one block per worker.
+    segment_dir : str, optional
+        Keep finished blocks here, listed in parallel.json, so a render that was interrupted only
+        renders the missing blocks when run again with the same settings. Removed on success.
+
+    returns
+    -------
+    output_file, or frames_dir when frames are saved as images.
+    '''
+    workers = workers or os.cpu_count() or 1
+    outputs = list(outputs) if outputs else [OutputSpec()]
+    payload = pickle.dumps(simulation)
+
+    if segment_frames:
+        blocks = [np.arange(start, min(start + segment_frames, frames)) for start in range(0, frames, segment_frames)]
+    else:
+        blocks = [block for block in np.array_split(np.arange(frames), workers) if len(block)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # run the physics once, on a copy so the caller's scene stays at its initial state
+        trajectory_path = os.path.join(tmpdir, "trajectory.npy")
+        scene = pickle.loads(payload)
+        trajectory = np.lib.format.open_memmap(trajectory_path, mode="w+", dtype=np.float64,
+                                               shape=(frames, len(scene.star_masses), 3))
+        scene.record(frames, dt, out=trajectory)
+        trajectory.flush()
+        del trajectory
+
+        if frames_dir is not None:
+            os.makedirs(frames_dir, exist_ok=True)
+            with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+                jobs = [pool.submit(render_frames, payload, trajectory_path, int(block[0]), int(block[-1]) + 1,
+                                    dt, width, height, fps, focal_length, renderer, camera_path, frames_dir, True)
+                        for block in blocks]
+                for job in jobs:
+                    job.result()
+            return frames_dir
+
+        directory = segment_dir or tmpdir
+        os.makedirs(directory, exist_ok=True)
+        manifest = BlockManifest(os.path.join(directory, "parallel.json"), {
+            "frames": frames, "dt": dt, "fps": fps, "width": width, "height": height,
+            "blocks": [[int(block[0]), int(block[-1]) + 1] for block in blocks],
+            "outputs": [asdict(spec) for spec in outputs],
+        })
+
+        def block_files(i):
+            return [os.path.join(directory, f"block_{i:05d}_{j}{os.path.splitext(spec.file or '')[1] or '.mp4'}")
+                    for j, spec in enumerate(outputs)]
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            jobs = {}
+            for i, block in enumerate(blocks):
+                if manifest.done(i, block_files(i)):
+                    continue
+                specs = [replace(spec, file=file) for spec, file in zip(outputs, block_files(i))]
+                jobs[pool.submit(render_frames, payload, trajectory_path, int(block[0]), int(block[-1]) + 1,
+                                 dt, width, height, fps, focal_length, renderer, camera_path, specs)] = i
+            for job in as_completed(jobs):
+                job.result()
+                manifest.add(jobs[job])
+
+        recorder = Recorder(fps)
+        for j, file in enumerate(output_files(outputs, output_file)):
+            code = recorder.concat([block_files(i)[j] for i in range(len(blocks))], output_file=file)
+            if code != 0:
+                raise RuntimeError(f"ffmpeg failed joining the blocks of {file} with exit code {code}")
+
+    if segment_dir is not None:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+    return output_file
+
+
+class BlockManifest:
+    '''The blocks of a parallel render that finished, kept in a JSON file next to them.
+
+    Blocks listed by an earlier run are only trusted when every setting matches and their files exist.
+    '''
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.finished = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                previous = json.load(f)
+            if previous.get("settings") == json.loads(json.dumps(settings)):
+                self.finished = set(previous["finished"])
+        self.write()
+
+    def done(self, block, files):
+        return block in self.finished and all(os.path.exists(file) for file in files)
+
+    def add(self, block):
+        self.finished.add(block)
+        self.write()
+
+    def write(self):
+        partial = self.path + ".tmp"
+        with open(partial, "w") as f:
+            json.dump({"settings": self.settings, "finished": sorted(self.finished)}, f, indent=2)
+        os.replace(partial, self.path)
+
+
+def render_frames(payload, trajectory_path, start, stop, dt, width, height, fps, focal_length, renderer,
+                  camera_path, target, save_images = False):
+    '''Worker for render_parallel: draws frames start..stop-1 headless and writes them to target.
+
+    target is a list of OutputSpec with their files set, one per output, or the directory frames
+    are saved in when save_images is True.
+
+    returns
+    -------
+    target
+    '''
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.init()
+    # pool processes run several jobs, and each job ends with pygame.quit()
+    clear_font_cache()
+
+    simulation = pickle.loads(payload)
+    trajectory = np.load(trajectory_path, mmap_mode="r")
+
+    screen = pygame.Surface((width, height))
+    clock = FrameClock(fps)
+    view = renderer(screen, width, height, present=False, focal_length=focal_length, clock=clock)
+    recorder = Recorder(fps, outputs=target) if not save_images else None
+    if recorder is not None:
+        recorder.start()
+
+    for frame in range(start, stop):
+        simulation.load_frame(trajectory, frame)
+        clock.seek(frame, dt)
+        if camera_path is not None:
+            camera, view.rx, view.ry = camera_path(frame)
+            view.camera = Vec3(camera.x, camera.y, camera.z)
+        # nothing carried over from the previous frame, so blocks can start anywhere
+        view.reset_caches()
+        view.draw(simulation)
+
+        if save_images:
+            pygame.image.save(screen, os.path.join(target, f"frame_{frame:05d}.png"))
+        else:
+            recorder.save_frame(screen)
+
+    if recorder is not None:
+        recorder.stop()
+    pygame.quit()
+    return target
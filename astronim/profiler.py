@@ -0,0 +1,161 @@
+import csv
+import json
+import time
+import numpy as np
+
+
+#Phases in the order they happen during a frame
+PHASES = ("events", "physics", "trails", "cull", "project", "draw", "hud", "flip", "record")
+
+
+class Profiler:
+    '''Per-phase frame timings kept in a preallocated ring buffer.
+
+    Instrumented code calls mark(phase) when a phase ends, so each phase costs one perf_counter
+    call. Object drawing is also timed per object type, counting drawn and culled objects apart. Every instrumented call site
+    is guarded by `if profiler:`. A profiler is only truthy between begin_frame and end_frame, and
+    begin_frame is only called while it is enabled, so turning it off costs a single truth test per
+    phase, and enabling it halfway through a frame starts recording at the next frame.
+
+    Attributes
+    ----------
+    enabled : bool
+        Frames started while True are recorded.
+    in_frame : bool
+        True between begin_frame and end_frame.
+    hud : bool
+        Draws a summary of the last frames on screen (see draw_hud).
+    capacity : int
+        Number of frames kept. Older frames are overwritten.
+    frames : int
+        Number of frames recorded so far, including overwritten ones.
+
+    Methods
+    -------
+    begin_frame(), mark(phase), add_object(cls, seconds, culled), end_frame():
+        Instrumentation calls, see each method.
+    report():
+        Percentiles per phase over the recorded frames.
+    dump(path):
+        Writes report() as JSON, or every recorded frame as CSV when path ends in .csv.
+    '''
+    def __init__(self, enabled: bool = True, capacity: int = 3600, max_types: int = 16, hud: bool = False):
+        self.enabled = enabled
+        self.hud = hud
+        self.capacity = capacity
+        self.max_types = max_types
+        self.frames = 0
+        self.in_frame = False
+
+        # columns: one per phase, then the total, then time, drawn count and culled count per object type
+        self.phase_column = {phase: i for i, phase in enumerate(PHASES)}
+        self.total_column = len(PHASES)
+        self.types = {}
+        self.samples = np.zeros((capacity, len(PHASES) + 1 + 3 * max_types))
+        self.row = self.samples[0]
+        self.frame_start = self.last = time.perf_counter()
+
+    def __bool__(self):
+        return self.in_frame
+
+    def begin_frame(self):
+        self.in_frame = True
+        self.row = self.samples[self.frames % self.capacity]
+        self.row[:] = 0
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        '''Ends phase: the time since the previous mark (or the start of the frame) is added to it.'''
+        now = time.perf_counter()
+        self.row[self.phase_column[phase]] += now - self.last
+        self.last = now
+
+    def add_object(self, cls, seconds, culled = False):
+        '''Adds one object of type cls that took seconds, counted as culled when it wasn't drawn.'''
+        slot = self.types.get(cls)
+        if slot is None:
+            if len(self.types) == self.max_types:
+                return
+            slot = self.types[cls] = len(self.types)
+        column = self.total_column + 1 + 3 * slot
+        self.row[column] += seconds
+        self.row[column + 2 if culled else column + 1] += 1
+
+    def end_frame(self):
+        self.row[self.total_column] = time.perf_counter() - self.frame_start
+        self.frames += 1
+        self.in_frame = False
+
+    def recorded(self):
+        '''The recorded rows, oldest first.'''
+        if self.frames <= self.capacity:
+            return self.samples[:self.frames]
+        start = self.frames % self.capacity
+        return np.concatenate([self.samples[start:], self.samples[:start]])
+
+    def columns(self):
+        '''Name of every column of recorded(), times in seconds.'''
+        names = list(PHASES) + ["total"]
+        for cls in sorted(self.types, key=self.types.get):
+            names += [f"{cls.__name__}_time", f"{cls.__name__}_count", f"{cls.__name__}_culled"]
+        return names + [""] * (self.samples.shape[1] - len(names))
+
+    def report(self, percentiles = (50, 90, 99)):
+        '''
+        returns
+        -------
+        dict with one entry per phase, per object type and the frame total, each holding the mean,
+        the given percentiles and the max in milliseconds. Object types also get their mean drawn and
+        culled counts.
+        '''
+        rows = self.recorded()
+        report = {"frames": len(rows)}
+        if not len(rows):
+            return report
+
+        def summary(values):
+            ms = values * 1000
+            entry = {"mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+            for p, value in zip(percentiles, np.percentile(ms, percentiles)):
+                entry[f"p{p}_ms"] = float(value)
+            return entry
+
+        for phase, column in self.phase_column.items():
+            report[phase] = summary(rows[:, column])
+        report["total"] = summary(rows[:, self.total_column])
+
+        for cls, slot in self.types.items():
+            column = self.total_column + 1 + 3 * slot
+            report[cls.__name__] = {**summary(rows[:, column]), "mean_count": float(rows[:, column + 1].mean()),
+                                    "mean_culled": float(rows[:, column + 2].mean())}
+        return report
+
+    def dump(self, path):
+        '''Writes report() to a .json file, or every recorded frame to a .csv file.'''
+        if str(path).endswith(".csv"):
+            names = [name for name in self.columns() if name]
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(names)
+                writer.writerows(self.recorded()[:, :len(names)].tolist())
+        else:
+            with open(path, "w") as f:
+                json.dump(self.report(), f, indent=2)
+
+    def draw_hud(self, screen, frames = 60):
+        '''Draws the mean time of every phase over the last frames in the top left corner.'''
+        from astronim.objects.text import get_font, FONT_FAMILY
+
+        rows = self.recorded()[-frames:]
+        if not len(rows):
+            return
+        mean = rows.mean(axis=0)
+        lines = [f"frame {mean[self.total_column] * 1000:6.2f} ms"]
+        lines += [f"{phase:<8}{mean[column] * 1000:6.2f} ms" for phase, column in self.phase_column.items()]
+        for cls, slot in self.types.items():
+            column = self.total_column + 1 + 3 * slot
+            lines.append(f"{cls.__name__:<8}{mean[column] * 1000:6.2f} ms  x{mean[column + 1]:.0f}  culled {mean[column + 2]:.0f}")
+
+        font = get_font(FONT_FAMILY, 16)
+        for i, line in enumerate(lines):
+            screen.blit(font.render(line, True, (0, 255, 0)), (10, 10 + 18 * i))
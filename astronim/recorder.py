@@ -1,31 +1,328 @@
 import os
+import sys
+import json
+import time
+import queue
+import shutil
 import pygame
 import tempfile
+import threading
 import subprocess
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class OutputSpec: 
+    '''One video produced from the recorded frames. 
+
+    Attributes
+    ----------
+    file : str or None
+        Where to save the video. None means the output_file passed to Recorder.stop, with a size 
+        suffix (output_720p.mp4) when several outputs leave it out, see output_files. 
+    width, height : int or None
+        Output size. None keeps the rendered size; giving only one keeps the aspect ratio. 
+    codec : str
+        ffmpeg video encoder. 
+    crf : int or None
+        Constant rate factor (lower is better quality), None for the encoder's default. 
+    fps : float or None
+        Output frame rate, None for the recorder's frame rate. 
+    preset : str or None
+        Encoder speed preset, for example "slow" for a master and "veryfast" for a preview. 
+    pix_fmt : str
+        Output pixel format. 
+    '''
+    file: str = None
+    width: int = None
+    height: int = None
+    codec: str = "libx264"
+    crf: int = None
+    fps: float = None
+    preset: str = None
+    pix_fmt: str = "yuv420p"
+
+    def scaled(self): 
+        return self.width is not None or self.height is not None
+
+    def suffix(self): 
+        '''Name part telling this output apart from others saved next to the same output_file.'''
+        if self.height is not None: 
+            return f"_{self.height}p"
+        if self.width is not None: 
+            return f"_{self.width}w"
+        return ""
+
+    def encoder_args(self): 
+        args = ["-c:v", self.codec]
+        if self.crf is not None: 
+            args += ["-crf", str(self.crf)]
+        if self.preset is not None: 
+            args += ["-preset", self.preset]
+        if self.fps is not None: 
+            args += ["-r", str(self.fps)]
+        return args + ["-pix_fmt", self.pix_fmt]
+
+
+def output_files(outputs, output_file): 
+    '''
+    The file every output is saved to. Outputs without a file share output_file: alone they get it 
+    as is, together each gets its size suffix (and its position, if sizes repeat). 
+
+    raises
+    ------
+    ValueError if two outputs would still write the same file. 
+    '''
+    unnamed = [i for i, spec in enumerate(outputs) if not spec.file]
+    base, extension = os.path.splitext(output_file)
+    suffixes = {i: outputs[i].suffix() for i in unnamed}
+    if len(unnamed) > 1 and len(set(suffixes.values())) < len(unnamed): 
+        suffixes = {i: f"{suffix}_{i}" for i, suffix in suffixes.items()}
+
+    files = [spec.file if spec.file else 
+             (output_file if len(unnamed) == 1 else f"{base}{suffixes[i]}{extension}") 
+             for i, spec in enumerate(outputs)]
+
+    targets = [os.path.abspath(file) for file in files]
+    if len(set(targets)) < len(targets): 
+        raise ValueError(f"several outputs would be written to the same file: {files}")
+    return files
+
+
+def output_args(outputs, files): 
+    '''
+    ffmpeg arguments encoding input 0 into every output in one process: the decoded frames are 
+    split once and each branch is scaled only if its spec asks for it. 
+
+    params
+    ------
+    outputs : list of OutputSpec
+        The videos to produce. 
+    files : list of str
+        File to write for each spec. 
+    '''
+    if len(outputs) == 1 and not outputs[0].scaled(): 
+        return outputs[0].encoder_args() + [files[0]]
+
+    labels = "".join(f"[s{i}]" for i in range(len(outputs)))
+    filters = [f"[0:v]split={len(outputs)}{labels}" if len(outputs) > 1 else "[0:v]null[s0]"]
+    for i, spec in enumerate(outputs): 
+        if spec.scaled(): 
+            width = spec.width if spec.width is not None else -2
+            height = spec.height if spec.height is not None else -2
+            filters.append(f"[s{i}]scale={width}:{height}:flags=lanczos[o{i}]")
+        else: 
+            filters.append(f"[s{i}]null[o{i}]")
+
+    args = ["-filter_complex", ";".join(filters)]
+    for i, (spec, file) in enumerate(zip(outputs, files)): 
+        args += ["-map", f"[o{i}]"] + spec.encoder_args() + [file]
+    return args
 
 
 class Recorder:
     '''Records the scene frame-by-frame and compiles it into an mp4 file using ffmpeg. 
 
+    By default frames are streamed: ffmpeg runs for the whole recording, reading raw pixels on stdin 
+    straight from each surface's buffer, so encoding finishes when the loop does. With stream=False 
+    every frame is saved as a PNG and encoded at stop(). 
+
+    Any number of outputs (a master and its previews) come out of the same frames in one ffmpeg 
+    process, see OutputSpec. 
+
+    While streaming, frames are copied into one of queue_size preallocated buffers and written to 
+    ffmpeg by a background thread (see FrameWriter), so encoding overlaps rendering. queue_size=0 
+    writes each frame from the main loop instead. 
+
+    With segment_frames, the stream is cut into segments of that many frames. Each segment gets its 
+    own ffmpeg, up to encode_workers of them finish encoding in the background while rendering goes on, 
+    and stop() only stream-copies the segments together. Finished segments are listed in a manifest 
+    in segment_dir, so a render that was interrupted can start again after the last complete segment 
+    (see resume_frames). 
+
     Attributes
     ----------
     recording : bool
         Records the scene when True. 
+    fps : float
+        Frame rate of the output video. 
+    stream : bool
+        Pipe raw frames into a running ffmpeg instead of writing PNGs. 
     frame_count : int
         The number of frames recorded. Initially zero. 
     tmpdir : tempfile.TemporaryDirectory or None
-        Temporary directory used to store image frames while recording. 
+        Temporary directory used to store image frames (or the streamed video) while recording. 
+    encoder : subprocess.Popen or None
+        The ffmpeg process frames are streamed to. 
+    queue_size : int
+        Number of frame buffers between the main loop and the writer thread. 
+    drop_frames : bool
+        Drop a frame instead of waiting when every buffer is still queued. Off for offline renders. 
+    writer : FrameWriter or None
+        The background writer while streaming with queue_size > 0. 
+    outputs : list of OutputSpec
+        The videos to produce. Defaults to one video at the rendered size, saved to stop's output_file. 
+    segment_frames : int or None
+        Frames per segment, None records one continuous stream. 
+    segment_dir : str or None
+        Where segments and their manifest are kept. Without one they go in the temp directory 
+        and can't be resumed. 
+    encode_workers : int
+        Largest number of segment encoders running at once. 
+    resume_frames : int
+        Frames already covered by complete segments when recording started. The scene should be 
+        advanced by this many frames before the first save_frame. 
     ''' 
-    def __init__(self):
+    def __init__(self, fps = 60, stream = True, queue_size = 4, drop_frames = False, outputs = None, 
+                 segment_frames = None, segment_dir = None, encode_workers = 2):
+        if segment_frames is not None and not stream: 
+            raise ValueError("Segmented recording needs stream=True")
+
+        self.fps = fps
+        self.outputs = list(outputs) if outputs else [OutputSpec()]
+        self.segment_frames = segment_frames
+        self.segment_dir = segment_dir
+        self.encode_workers = encode_workers
+        self.resume_frames = 0
+        self.stream = stream
+        self.queue_size = queue_size
+        self.drop_frames = drop_frames
         self.recording = False
         self.frame_count = 0
         self.tmpdir = None
+        self.encoder = None
+        self.writer = None
+        self.last_stats = None
+        self.frame_size = None
+
+        # set by Universe when profiling, see astronim.profiler
+        self.profiler = None
 
-    def start(self): 
+    def start(self, size = None): 
         '''Begins recording the scene. Creates a temp directory. 
+
+        params
+        ------
+        size : tuple, optional
+            (width, height) of the frames. When streaming, ffmpeg is launched here if the size 
+            is known, otherwise on the first frame. 
         '''
         self.recording = True
+        self.last_stats = None
         self.tmpdir = tempfile.TemporaryDirectory()
+        if self.segment_frames is not None: 
+            self.start_segments()
+        if self.stream and size is not None: 
+            self.open_encoder(pygame.Surface(size))
+
+    def start_segments(self): 
+        '''Reads the manifest and picks up after the last complete segment it lists.'''
+        directory = self.segment_dir or self.tmpdir.name
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = {
+            "fps": self.fps, 
+            "segment_frames": self.segment_frames, 
+            "outputs": [asdict(spec) for spec in self.outputs], 
+            "segments": [], 
+        }
+
+        if os.path.exists(self.manifest_path): 
+            with open(self.manifest_path) as f: 
+                previous = json.load(f)
+            settings = ("fps", "segment_frames", "outputs")
+            if all(previous.get(key) == self.manifest[key] for key in settings): 
+                # only the unbroken run of segments from the start can be reused
+                for index, segment in enumerate(previous["segments"]): 
+                    if segment["index"] != index or not all(os.path.exists(file) for file in segment["files"]): 
+                        break
+                    self.manifest["segments"].append(segment)
+
+        self.resume_frames = sum(segment["frames"] for segment in self.manifest["segments"])
+        self.frame_count = self.resume_frames
+        self.segment_index = len(self.manifest["segments"])
+        self.segment_count = 0
+        self.encoding = []
+        self.write_manifest()
+
+    def open_encoder(self, screen): 
+        '''Launches ffmpeg reading raw frames shaped like screen from stdin.'''
+        pix_fmt = pixel_format(screen)
+        if pix_fmt not in TOBYTES_FORMATS: 
+            pix_fmt = "rgb24"
+        self.pix_fmt = pix_fmt
+        self.frame_size = screen.get_size()
+        width, height = self.frame_size
+        files = self.segment_files(self.segment_index) if self.segment_frames is not None else self.stream_files()
+        self.encoder = subprocess.Popen([
+            "ffmpeg", "-y", "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}", 
+            "-framerate", str(self.fps), "-i", "-", 
+        ] + output_args(self.outputs, files), stdin=subprocess.PIPE)
+
+        if self.queue_size > 0: 
+            frame_bytes = memoryview(frame_buffer(screen, pix_fmt)).nbytes
+            self.writer = FrameWriter(self.encoder.stdin, frame_bytes, self.queue_size, self.drop_frames)
+
+    def stream_files(self): 
+        '''Files the streaming encoder writes in the temp directory, moved into place by stop().'''
+        files = []
+        for i, spec in enumerate(self.outputs): 
+            extension = os.path.splitext(spec.file)[1] if spec.file else ".mp4"
+            files.append(os.path.join(self.tmpdir.name, f"stream_{i}{extension or '.mp4'}"))
+        return files
+
+    def segment_files(self, index): 
+        '''Files segment index is encoded into, one per output.'''
+        directory = os.path.dirname(self.manifest_path)
+        files = []
+        for i, spec in enumerate(self.outputs): 
+            extension = os.path.splitext(spec.file)[1] if spec.file else ".mp4"
+            files.append(os.path.join(directory, f"segment_{index:05d}_{i}{extension or '.mp4'}"))
+        return files
+
+    def finish_segment(self): 
+        '''Closes the running segment's input and leaves ffmpeg to finish it in the background.'''
+        encoder, self.encoder = self.encoder, None
+        try: 
+            self.close_writer()
+        except BaseException: 
+            # the writer failed, so the segment is incomplete: don't leave its ffmpeg running
+            close_encoder(encoder)
+            raise
+        encoder.stdin.close()
+        self.encoding.append((encoder, self.segment_index, self.segment_count))
+        self.segment_index += 1
+        self.segment_count = 0
+
+        # keep at most encode_workers encoders busy
+        while len(self.encoding) >= self.encode_workers: 
+            self.collect_segments(wait=True)
+        self.collect_segments()
+
+    def collect_segments(self, wait = False): 
+        '''Adds segments whose encoder exited cleanly to the manifest, waiting for the oldest one if wait.'''
+        if wait and self.encoding: 
+            self.encoding[0][0].wait()
+
+        running = []
+        for encoder, index, frames in self.encoding: 
+            if encoder.poll() is None: 
+                running.append((encoder, index, frames))
+            elif encoder.returncode == 0: 
+                self.manifest["segments"].append({"index": index, "frames": frames, "files": self.segment_files(index)})
+            else: 
+                raise RuntimeError(f"ffmpeg failed on segment {index} with exit code {encoder.returncode}")
+
+        if len(running) < len(self.encoding): 
+            self.manifest["segments"].sort(key = lambda segment: segment["index"])
+            self.write_manifest()
+        self.encoding = running
+
+    def write_manifest(self): 
+        partial = self.manifest_path + ".tmp"
+        with open(partial, "w") as f: 
+            json.dump(self.manifest, f, indent=2)
+        os.replace(partial, self.manifest_path)
 
     def save_frame(self, screen): 
         '''Saves each frame in the scene. 
@@ -38,6 +335,33 @@ class Recorder:
         '''
         if not self.recording: 
             return
+
+        self.write_frame(screen)
+        if self.profiler: 
+            self.profiler.mark("record")
+
+    def write_frame(self, screen): 
+        '''Hands one frame to the encoder, or saves it as a PNG.'''
+
+        if self.stream: 
+            if self.encoder is None: 
+                self.open_encoder(screen)
+            if self.writer is not None: 
+                written = self.writer.put(frame_buffer(screen, self.pix_fmt))
+            else: 
+                self.encoder.stdin.write(frame_buffer(screen, self.pix_fmt))
+                written = True
+
+            if written: 
+                self.frame_count += 1
+                if self.segment_frames is not None: 
+                    self.segment_count += 1
+                    if self.segment_count == self.segment_frames: 
+                        self.finish_segment()
+                    elif self.encoding: 
+                        self.collect_segments()
+            return
+
         filename = os.path.join(self.tmpdir.name, f"frame_{self.frame_count:05d}.png")
         pygame.image.save(screen, filename)
         self.frame_count += 1
@@ -48,14 +372,277 @@ class Recorder:
         params
         ------
         output_file : str, optional
-            The file name to save to
+            The file name to save to, for outputs that don't name their own file. 
         '''
         self.recording = False
+        files = output_files(self.outputs, output_file)
+        if self.segment_frames is not None and self.tmpdir: 
+            self.stop_segments(files)
+            return
+        if self.encoder is not None: 
+            encoder, self.encoder = self.encoder, None
+            try: 
+                self.close_writer()
+            finally: 
+                code = close_encoder(encoder)
+            if code == 0: 
+                for streamed, file in zip(self.stream_files(), files): 
+                    shutil.move(streamed, file)
+            self.tmpdir.cleanup()
+            self.tmpdir = None
+            if code != 0: 
+                raise RuntimeError(f"ffmpeg failed with exit code {code}, no video was written")
+        elif self.stream and self.tmpdir: 
+            # started but never given a frame, so there is no encoder and nothing to encode
+            self.tmpdir.cleanup()
+            self.tmpdir = None
         if self.tmpdir:
             frame_pattern = os.path.join(self.tmpdir.name, "frame_%05d.png")
-            subprocess.run([
-                "ffmpeg", "-framerate", "60", "-i", frame_pattern,
-                "-c:v", "libx264", "-pix_fmt", "yuv420p", output_file
-            ])
+            code = subprocess.run([
+                "ffmpeg", "-framerate", str(self.fps), "-i", frame_pattern,
+            ] + output_args(self.outputs, files)).returncode
+            self.tmpdir.cleanup()
+            self.tmpdir = None
+            if code != 0: 
+                raise RuntimeError(f"ffmpeg failed with exit code {code}")
+
+    def discard(self): 
+        '''Stops recording and throws the captured frames away without making a video. Segments 
+        already listed in segment_dir are kept for a later resume.'''
+        self.recording = False
+        if self.encoder is not None: 
+            encoder, self.encoder = self.encoder, None
+            try: 
+                self.close_writer()
+            finally: 
+                close_encoder(encoder)
+        for encoder, _, _ in getattr(self, "encoding", []): 
+            encoder.wait()
+        self.encoding = []
+        if self.tmpdir: 
             self.tmpdir.cleanup()
-            self.tmpdir = None
\ No newline at end of file
+            self.tmpdir = None
+
+    def stop_segments(self, files): 
+        '''Finishes the last segment, waits for every encoder and joins the segments of each output.'''
+        if self.encoder is not None and self.segment_count: 
+            self.finish_segment()
+        elif self.encoder is not None: 
+            # opened for a segment that never got a frame
+            encoder, self.encoder = self.encoder, None
+            try: 
+                self.close_writer()
+            finally: 
+                close_encoder(encoder)
+        while self.encoding: 
+            self.collect_segments(wait=True)
+
+        segments = self.manifest["segments"]
+        joined = [self.concat([segment["files"][i] for segment in segments], output_file=file) 
+                  for i, file in enumerate(files)] if segments else []
+
+        self.tmpdir.cleanup()
+        self.tmpdir = None
+        failed = [(file, code) for file, code in zip(files, joined) if code != 0]
+        if failed: 
+            # segment_dir is kept, so a run with the same settings can join them again
+            raise RuntimeError(", ".join(f"ffmpeg failed joining the segments of {file} with exit code {code}" 
+                                         for file, code in failed))
+        if self.segment_dir is not None and joined: 
+            shutil.rmtree(self.segment_dir)
+
+    def concat(self, segments, output_file = "output.mp4"): 
+        '''Joins already encoded videos, in the given order, into one file without re-encoding. 
+
+        params
+        ------
+        segments : list of str
+            Paths of the videos to join. They must share codec, size and frame rate. 
+        output_file : str, optional
+            The file name to save to
+
+        returns
+        -------
+        ffmpeg's exit code. 
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir: 
+            listing = os.path.join(tmpdir, "segments.txt")
+            with open(listing, "w") as f: 
+                for segment in segments: 
+                    f.write(f"file '{os.path.abspath(segment)}'\n")
+            return subprocess.run([
+                "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", listing, 
+                "-c", "copy", output_file
+            ]).returncode
+
+    def stats(self): 
+        '''Writer thread statistics (see FrameWriter.stats) summed over every segment so far, or None when frames are written synchronously.'''
+        if self.writer is not None: 
+            return combine_stats(self.last_stats, self.writer.stats())
+        return self.last_stats
+
+    def close_writer(self): 
+        '''Stops the writer thread, if there is one, and adds its statistics to last_stats.'''
+        writer, self.writer = self.writer, None
+        if writer is None: 
+            return
+        try: 
+            writer.close()
+        finally: 
+            self.last_stats = combine_stats(self.last_stats, writer.stats())
+
+
+class FrameWriter: 
+    '''Writes frames to a pipe from a background thread, through a bounded pool of preallocated buffers. 
+
+    put() copies a frame into a free buffer and returns right away; the thread writes filled buffers 
+    in order and hands them back. When every buffer is waiting to be written, put() blocks (or drops 
+    the frame with drop_frames), which bounds memory to queue_size frames. 
+
+    Attributes
+    ----------
+    frames_written, frames_dropped : int
+        Frames the thread finished writing, and frames put() threw away for lack of a buffer. 
+    blocked_seconds : float
+        Time put() spent waiting for a free buffer. 
+    write_seconds : float
+        Time the thread spent writing into the pipe. 
+    max_depth : int
+        Largest number of frames queued at once. 
+    '''
+    def __init__(self, pipe, frame_bytes, queue_size = 4, drop_frames = False): 
+        self.pipe = pipe
+        self.frame_bytes = frame_bytes
+        self.drop_frames = drop_frames
+        self.buffers = [bytearray(frame_bytes) for _ in range(queue_size)]
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for i in range(queue_size): 
+            self.free.put(i)
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.blocked_seconds = 0.0
+        self.write_seconds = 0.0
+        self.max_depth = 0
+        self.error = None
+        self.started = time.perf_counter()
+
+        self.thread = threading.Thread(target=self.run, name="astronim-frame-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, frame): 
+        '''Queues a copy of frame (any bytes-like object of frame_bytes). Returns False if it was dropped.'''
+        if self.error is not None: 
+            raise self.error
+
+        try: 
+            i = self.free.get_nowait()
+        except queue.Empty: 
+            if self.drop_frames: 
+                self.frames_dropped += 1
+                return False
+            waited = time.perf_counter()
+            i = self.free.get()
+            self.blocked_seconds += time.perf_counter() - waited
+
+        memoryview(self.buffers[i])[:] = memoryview(frame).cast("B")
+        self.filled.put(i)
+        self.max_depth = max(self.max_depth, self.filled.qsize())
+        return True
+
+    def run(self): 
+        while True: 
+            i = self.filled.get()
+            if i is None: 
+                return
+            try: 
+                start = time.perf_counter()
+                self.pipe.write(self.buffers[i])
+                self.write_seconds += time.perf_counter() - start
+                self.frames_written += 1
+            except Exception as e: 
+                self.error = e
+            self.free.put(i)
+
+    def close(self): 
+        '''Waits for every queued frame to be written and stops the thread.'''
+        self.filled.put(None)
+        self.thread.join()
+        if self.error is not None: 
+            raise self.error
+
+    def stats(self): 
+        '''
+        returns
+        -------
+        dict with the current queue depth, its maximum, frames written and dropped, seconds the 
+        main loop was blocked, seconds spent writing, and the encoder throughput in frames and MB 
+        per second of writing time. 
+        '''
+        return {
+            "queue_depth": self.filled.qsize(), 
+            "max_queue_depth": self.max_depth, 
+            "frames_written": self.frames_written, 
+            "frames_dropped": self.frames_dropped, 
+            "blocked_seconds": self.blocked_seconds, 
+            "write_seconds": self.write_seconds, 
+            "frames_per_second": self.frames_written / self.write_seconds if self.write_seconds else 0.0, 
+            "megabytes_per_second": self.frames_written * self.frame_bytes / 1e6 / self.write_seconds if self.write_seconds else 0.0, 
+        }
+
+
+def combine_stats(total, stats): 
+    '''Adds FrameWriter.stats of one more writer (one segment) to the totals of the ones before.'''
+    if total is None: 
+        return stats
+    combined = {key: total[key] + stats[key] for key in 
+                ("frames_written", "frames_dropped", "blocked_seconds", "write_seconds")}
+    combined["queue_depth"] = stats["queue_depth"]
+    combined["max_queue_depth"] = max(total["max_queue_depth"], stats["max_queue_depth"])
+    seconds = combined["write_seconds"]
+    combined["frames_per_second"] = combined["frames_written"] / seconds if seconds else 0.0
+    megabytes = total["megabytes_per_second"] * total["write_seconds"] + stats["megabytes_per_second"] * stats["write_seconds"]
+    combined["megabytes_per_second"] = megabytes / seconds if seconds else 0.0
+    return combined
+
+
+def close_encoder(encoder): 
+    '''Closes ffmpeg's input and waits for it to exit. Returns its exit code.'''
+    try: 
+        encoder.stdin.close()
+    except OSError: 
+        # ffmpeg already died and the pipe is broken, its exit code tells why
+        pass
+    return encoder.wait()
+
+
+#pygame.image.tobytes formats producing the same bytes as an ffmpeg pix_fmt, used when a frame can't be passed as is
+TOBYTES_FORMATS = {"rgb24": "RGB", "rgb0": "RGBX", "bgr0": "BGRA", "0rgb": "ARGB"}
+
+
+def pixel_format(surface): 
+    '''The ffmpeg pix_fmt matching the byte order of a surface's pixels, or None if there is no match.'''
+    r, g, b, _ = surface.get_masks()
+    bytesize = surface.get_bytesize()
+    if bytesize not in (3, 4) or {r, g, b} != {0xff, 0xff00, 0xff0000}: 
+        return None
+
+    # masks are for the pixel as an integer, bytes in memory follow the machine's byte order
+    red_first = (r == 0xff) == (sys.byteorder == "little")
+    if bytesize == 3: 
+        return "rgb24" if red_first else "bgr24"
+
+    # 32-bit pixels have their spare byte after the color on little-endian machines
+    if sys.byteorder == "little": 
+        return "rgb0" if red_first else "bgr0"
+    return "0rgb" if red_first else "0bgr"
+
+
+def frame_buffer(surface, pix_fmt): 
+    '''The pixels of surface in pix_fmt, as a view of the surface's own memory when its rows have no padding.'''
+    width, height = surface.get_size()
+    if pix_fmt == pixel_format(surface) and surface.get_pitch() == width * surface.get_bytesize(): 
+        return surface.get_buffer()
+    return pygame.image.tobytes(surface, TOBYTES_FORMATS[pix_fmt])
+
@@ -1,11 +1,15 @@
+import time
 import pygame
-from astronim.utils.tools import get_2d, Vec3, distance
+from astronim.utils.tools import Vec3, Projection, simplify_polyline
+from astronim.utils.constants import DEPTH, REFERENCE_HEIGHT
+from astronim.clock import FrameClock
+from astronim.objects.impostor import impostor_cache
 import numpy as np
 class Renderer:
     '''Handles the rendering for a scene. 
 
-    -Sorts every object by distance. 
-    -Draws each object according to their distance away. 
+    -Sorts every star and static object by distance in one draw list, reusing the last frame's order. 
+    -Draws each object according to their distance away, skipping objects outside the view. 
     -Passes in camera and mouse information to each object.
 
     Attributes
@@ -16,8 +20,26 @@ class Renderer:
         The width of the screen. 
     height : int
         The height of the screen. 
+    focal_length : float
+        Focal length of the projection in pixels. Defaults to DEPTH at REFERENCE_HEIGHT and scales 
+        with height, so the same scene has the same framing at any resolution. 
+    clock : FrameClock
+        Frame clock handed to every object with the camera, animations read it instead of wall time. 
+        A Renderer made without one owns its clock and advances it after every draw. 
     camera : Vec3
         The camera position in 3d space. 
+    trail_tolerance : float
+        Trails are simplified until they stray this many pixels from the full path, so long trails 
+        cost about as much to draw as short ones. 0 draws every point. 
+    trail_exact : bool
+        Simplify trails with Douglas-Peucker, which keeps them within trail_tolerance for certain, 
+        instead of the faster adaptive decimation, which only roughly does. 
+    cull_margin : int
+        Objects whose bounding sphere is further than this many pixels outside the screen 
+        are not drawn. It has to cover the largest glow (a star's glow is at most 160 pixels). 
+        Like glow sizes, it is given at the reference focal length and scaled with it. 
+    present : bool
+        Flips the display after each frame. False when screen is an offscreen surface (headless). 
     rx : float
         Rotation angle of the camera around the x-axis (radians).
     ry : float
@@ -28,50 +50,184 @@ class Renderer:
     draw(simulation): 
         Clears the screen, draws all objects in the simulation according to distance from the camera. 
 
+    in_view(objects, projection): 
+        Drops the objects whose bounding spheres are entirely outside the view. 
+
     
     ''' 
-    def __init__(self, screen, width, height):
+    def __init__(self, screen, width, height, present = True, focal_length = None, clock = None):
         self.screen = screen
         self.width = width 
         self.height = height 
+        self.focal_length = focal_length if focal_length is not None else DEPTH * height / REFERENCE_HEIGHT
+        self.present = present
+        self.clock = clock if clock is not None else FrameClock()
+        self._owns_clock = clock is None
         self.camera = Vec3(0, 0, 0)
         self.rx = 0
         self.ry = 0
         self.camera_movement_called = False
+        self.cull_margin = 160
+        self.trail_tolerance = 1.0
+        self.trail_exact = False
+
+        self._scene_key = None
+        self._order = np.zeros(0, dtype=np.int64)
+
+        # set by Universe when profiling, see astronim.profiler
+        self.profiler = None
 
     def draw(self, simulation): 
         '''Render all objects in the given simulation to the screen.
 
+        Stars and static objects share one draw list, painted from farthest to nearest. 
+
         params
         ------
         simulation : Simulation
             The current simulation containing star_objects and static_objects.
         '''
+        profiler = self.profiler
         self.screen.fill((0, 0, 0))
 
-        order = []
-        for obj in simulation.star_objects: 
-            dist = distance(obj.pos, self.camera)
-            order.append(dist)
+        # one projection per frame, shared by every object
+        projection = self.projection()
+
+        objects = self.draw_list(simulation)
+        n_stars = len(simulation.star_objects)
+
+        # centers and bounding radii of everything, stars straight from the simulation arrays
+        centers = np.empty((len(objects), 3))
+        radii = np.zeros(len(objects))
+        bounded = np.ones(len(objects), dtype=bool)
+        centers[:n_stars] = simulation.star_positions[self._star_index]
+        for i, obj in enumerate(simulation.static_objects, start=n_stars): 
+            if hasattr(obj, "bounding_sphere"): 
+                centers[i], radii[i] = obj.bounding_sphere()
+            else: 
+                # unbounded objects are never culled, and without a position they are drawn last
+                pos = getattr(obj, "pos", self.camera)
+                centers[i] = pos.x, pos.y, pos.z
+                bounded[i] = False
+
+        depth = np.sqrt(((centers - projection.camera) ** 2).sum(axis=1)) + 1
+        visible = ~bounded | projection.spheres_visible(centers, radii, self.cull_margin * projection.pixel_scale)
+        order = self.sort_by_depth(depth).tolist()
+        if profiler: 
+            profiler.mark("cull")
+
+        for cls in self._draw_types: 
+            cls.set_camera(self.camera, self.rx, self.ry, projection, self.clock)
+
+        self.project_trails(simulation, projection)
+        if profiler: 
+            profiler.mark("project")
+
+        # while profiling every object is timed (trails count towards their star) and counted as drawn or culled
+        clock = time.perf_counter if profiler else None
+        for i in order: 
+            obj = objects[i]
+            if clock: 
+                start = clock()
+            if visible[i]: 
+                obj.draw(self.screen)
+
+            # trails can reach into view even when their star is off screen
+            if i < n_stars and obj.trail: 
+                obj.draw_trail(self.screen, self.trail_path(obj))
+            if clock: 
+                profiler.add_object(type(obj), clock() - start, culled=not visible[i])
 
-        stars_sorted = np.array(simulation.star_objects)[np.argsort(order)[::-1]].tolist()
+        if self.camera_movement_called: 
+            self.camera_function(self.camera)
 
-        for obj in stars_sorted: 
-            obj.set_camera(self.camera, self.rx, self.ry)
-            obj.draw(self.screen)
+        if self._owns_clock: 
+            self.clock.tick()
+
+        if profiler: 
+            profiler.mark("draw")
+            if profiler.hud: 
+                profiler.draw_hud(self.screen)
+                profiler.mark("hud")
+
+        if self.present: 
+            pygame.display.flip()
+        if profiler: 
+            profiler.mark("flip")
+
+    def projection(self): 
+        '''The Projection for the current camera and this renderer's viewport.'''
+        return Projection(self.camera, self.rx, self.ry, self.width, self.height, self.focal_length)
+
+    def draw_list(self, simulation): 
+        '''All star and static objects as one list, rebuilt only when the scene changes.'''
+        stars, statics = simulation.star_objects, simulation.static_objects
+        key = (id(simulation), len(stars), len(statics), 
+               id(stars[-1]) if stars else None, id(statics[-1]) if statics else None)
+
+        if key != self._scene_key: 
+            self._scene_key = key
+            self._draw_objects = stars + statics
+            self._draw_types = list(dict.fromkeys(type(obj) for obj in self._draw_objects))
+            self._star_index = np.array([obj.index for obj in stars], dtype=np.int64)
+            self._order = np.arange(len(self._draw_objects))
+
+        return self._draw_objects
+
+    def project_trails(self, simulation, projection): 
+        '''Projects every point of every trail in one call, for trail_path to slice from.'''
+        points, counts = simulation.trails()
+        rows, length = points.shape[:2]
+        xy, visible, _ = projection.project(points.reshape(-1, 3))
+        self._trails_2d = xy.reshape(rows, length, 2), visible.reshape(rows, length), counts
+
+    def trail_path(self, obj): 
+        '''The projected, simplified trail of one star as (M, 2) screen points (points behind the camera are dropped).'''
+        if obj.trail_row is None: 
+            return np.zeros((0, 2), dtype=np.int64)
+        xy, visible, counts = self._trails_2d
+        start = xy.shape[1] - min(counts[obj.trail_row], obj.trail_length)
+        row = slice(start, None)
+        path = xy[obj.trail_row, row][visible[obj.trail_row, row]]
+        if self.trail_tolerance: 
+            path = simplify_polyline(path, self.trail_tolerance, self.trail_exact)
+        return path
+
+    def sort_by_depth(self, depth): 
+        '''Returns draw-list indices from farthest to nearest. 
+
+        The previous frame's order is applied first, so the input is nearly sorted and the 
+        stable sort (timsort for floats) finishes in close to linear time. Ties keep last frame's order. 
+        '''
+        step = np.argsort(-depth[self._order], kind="stable")
+        self._order = self._order[step]
+        return self._order
 
-            if obj.trail: 
-                obj.draw_trail(self.screen)
+    def reset_caches(self): 
+        '''Forgets the work carried between frames (depth order, galaxy billboards), so the next 
+        frame is drawn exactly as if it were the first.'''
+        self._order = np.arange(len(self._order))
+        impostor_cache.clear()
 
-        for obj in simulation.static_objects: 
-            obj.set_camera(self.camera, self.rx, self.ry)
-            obj.draw(self.screen)
+    def in_view(self, objects, projection): 
+        '''Returns the objects that can appear on screen. Objects without a bounding_sphere are always kept.
 
-        if self.camera_movement_called: 
-            self.camera_function(self.camera)
+        params
+        ------
+        objects : list
+            The objects to test. 
+        projection : Projection
+            The projection for this frame. 
+        '''
+        bounded = [obj for obj in objects if hasattr(obj, "bounding_sphere")]
+        if not bounded: 
+            return objects
 
+        centers, radii = zip(*(obj.bounding_sphere() for obj in bounded))
+        visible = projection.spheres_visible(np.array(centers, dtype=np.float64), np.array(radii), self.cull_margin * projection.pixel_scale)
+        culled = {id(obj) for obj, keep in zip(bounded, visible) if not keep}
 
-        pygame.display.flip()
+        return [obj for obj in objects if id(obj) not in culled]
 
     def camera_animation(self, camera_function):
         self.camera_movement_called = True 
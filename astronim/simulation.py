@@ -1,5 +1,6 @@
 from astronim.utils.leapfrog import updateParticles
 from astronim.utils.tools import distance, Vec3
+from astronim.utils.catalog import load_catalog
 import numpy as np
 from astronim.utils.constants import AU
 
@@ -9,39 +10,79 @@ class Simulation:
     Attributes
     ----------
     star_objects : list
-        A list of all the star objects in our scene. 
+        A list of all the star objects (render handles) in our scene. Bodies added in bulk 
+        only get a handle if they need to be drawn. 
     
-    star_masses : list
-        A list of all the star masses in our scene.
+    star_masses : np.ndarray
+        Shape (N,) array of all the body masses in our scene, in kg.
 
-    star_vels : list
-        A list of all the star velocities in our scene. 
+    star_vels : np.ndarray
+        Shape (N, 3) array of all the body velocities in our scene, in m/s. 
 
-    star_positions : list
-        A list of all the star positions in our scene. 
+    star_positions : np.ndarray
+        Shape (N, 3) array of all the body positions in our scene, in AU. 
 
     static_objects : list
         A list of all the objects whose positions will not be updated according to the N-body simulation.
 
+    trail_index : np.ndarray
+        Shape (R,) indices of the bodies that have trails enabled. 
+
+    trail_buffer : np.ndarray
+        Shape (R, trail_length, 3) ring buffer of past positions, one row per body in trail_index. 
+        Only these bodies have their positions recorded. 
+
+    trail_head : int
+        The slot of trail_buffer the next positions are written to. 
+
+    trail_counts : np.ndarray
+        Shape (R,) number of recorded positions in each row. 
+
     Methods
     -------
     add_star(obj): 
         Adds a star object to our simulation. 
     
+    add_bodies(masses, positions, velocities, render=None): 
+        Adds many bodies at once straight into the simulation arrays. 
+
+    load_catalog(path, columns=None, units=None, render=None): 
+        Adds every body in an initial-condition catalog (.npy, .npz or .csv). 
+
     add_static(obj): 
         Adds a static object to our simulation
 
+    add_trail(index, length): 
+        Starts recording the trail of one body. 
+
+    trails(): 
+        Returns every trail in order from oldest to newest point. 
+
     update(dt): 
         Updates the simulation by one specified time step, dt. 
+
+    record(frames, dt): 
+        Runs the simulation ahead and returns the position of every body after every step. 
+
+    load_frame(trajectory, frame): 
+        Puts every body (and trail) where a recorded trajectory has it at one frame. 
     '''
     def __init__(self):
         self.star_objects = []
-        self.star_masses = []
-        self.star_vels = []
-        self.star_positions = []
+        self.star_masses = np.zeros(0)
+        self.star_vels = np.zeros((0, 3))
+        self.star_positions = np.zeros((0, 3))
         
         self.static_objects = []
 
+        # set by Universe when profiling, see astronim.profiler
+        self.profiler = None
+
+        self.trail_index = np.zeros(0, dtype=np.int64)
+        self.trail_buffer = np.zeros((0, 0, 3))
+        self.trail_head = 0
+        self.trail_counts = np.zeros(0, dtype=np.int64)
+
     def add_star(self, star): 
         '''Adds a star object to our simulation. 
 
@@ -51,10 +92,99 @@ class Simulation:
             The object whose position, mass, and velocity will be added to our simulation.
             
         '''
+        star.index = len(self.star_masses)
         self.star_objects.append(star)
-        self.star_masses.append(star.mass)
-        self.star_vels.append(star.velocity)
-        self.star_positions.append([star.pos.x, star.pos.y, star.pos.z])
+        self.star_masses = np.append(self.star_masses, star.mass)
+        self.star_vels = np.vstack([self.star_vels, star.velocity])
+        self.star_positions = np.vstack([self.star_positions, [star.pos.x, star.pos.y, star.pos.z]])
+
+        if star.trail: 
+            star.trail_row = self.add_trail(star.index, star.trail_length)
+
+    def add_bodies(self, masses, positions, velocities, render=None, **star_kwargs): 
+        '''Adds many bodies at once. The arrays are appended to the simulation in one go, 
+        and Star handles are only created for the bodies selected by render. 
+
+        params
+        ------
+        masses : np.ndarray
+            Shape (n,) masses in kg. 
+
+        positions : np.ndarray
+            Shape (n, 3) positions in AU. 
+
+        velocities : np.ndarray
+            Shape (n, 3) velocities in m/s. 
+
+        render : np.ndarray, optional
+            Indices (or a boolean mask) of the bodies that should be drawn. 
+            Bodies without a handle are still simulated, just never drawn. 
+
+        star_kwargs : 
+            Passed on to Star for every handle (radius, color, trail). 
+
+        returns
+        -------
+        The list of Star handles that were created. 
+        '''
+        masses = np.asarray(masses, dtype=np.float64).reshape(-1)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 3)
+        if not len(masses) == len(positions) == len(velocities): 
+            raise ValueError("masses, positions and velocities have different lengths")
+
+        offset = len(self.star_masses)
+        self.star_masses = np.concatenate([self.star_masses, masses])
+        self.star_positions = np.concatenate([self.star_positions, positions])
+        self.star_vels = np.concatenate([self.star_vels, velocities])
+
+        if render is None: 
+            return []
+
+        # handles need pygame, bodies that are only simulated don't
+        from astronim.objects.star import Star
+
+        render = np.asarray(render)
+        if render.dtype == bool: 
+            render = np.flatnonzero(render)
+
+        handles = []
+        for i in render: 
+            star = Star(Vec3(*positions[i]), Vec3(*velocities[i]), masses[i], **star_kwargs)
+            star.index = offset + int(i)
+            handles.append(star)
+
+        for star in handles: 
+            if star.trail: 
+                star.trail_row = self.add_trail(star.index, star.trail_length)
+
+        self.star_objects.extend(handles)
+        return handles
+
+    def load_catalog(self, path, columns=None, units=None, render=None, chunksize=65536, **star_kwargs): 
+        '''Adds every body in an initial-condition catalog to the simulation. 
+        .npy files are memory-mapped and .csv files are read in chunks, see astronim.utils.catalog. 
+
+        params
+        ------
+        path : str
+            The .npy, .npz or .csv file to read. 
+
+        columns : dict, optional
+            Maps the fields "mass", "x", "y", "z", "vx", "vy", "vz" to column names or indices. 
+
+        units : dict, optional
+            Units of the mass, position and velocity columns, e.g. {"mass": "msun", "velocity": "km/s"}. 
+
+        render : np.ndarray, optional
+            Indices (or a boolean mask) of the catalog rows that should be drawn. 
+
+        returns
+        -------
+        The list of Star handles that were created. 
+        '''
+        masses, positions, velocities = load_catalog(path, columns=columns, units=units, chunksize=chunksize)
+        return self.add_bodies(masses, positions, velocities, render=render, **star_kwargs)
 
     def add_static(self, obj): 
         '''Adds a static object to our simulation. 
@@ -66,9 +196,53 @@ class Simulation:
         '''
         self.static_objects.append(obj)
 
+    def add_trail(self, index, length): 
+        '''Starts recording the trail of one body. The ring buffer is preallocated here, 
+        and grows (keeping every trail) when a longer trail is requested. 
+
+        params
+        ------
+        index : int
+            The body whose trail should be recorded. 
+        length : int
+            Number of past positions to keep. 
+
+        returns
+        -------
+        The row of trail_buffer holding this trail. 
+        '''
+        old_length = self.trail_buffer.shape[1]
+        new_length = max(old_length, int(length))
+
+        buffer = np.zeros((len(self.trail_index) + 1, new_length, 3))
+        if old_length: 
+            # unroll the old ring so the newest point sits right before the new head
+            order = (self.trail_head + np.arange(old_length)) % old_length
+            buffer[:-1, new_length - old_length:] = self.trail_buffer[:, order]
+        self.trail_head = 0
+
+        self.trail_buffer = buffer
+        self.trail_index = np.append(self.trail_index, index)
+        self.trail_counts = np.append(self.trail_counts, 0)
+        return len(self.trail_index) - 1
+
+    def trails(self): 
+        '''Returns every trail ordered from oldest to newest point. 
+
+        returns
+        -------
+        points : np.ndarray
+            Shape (R, trail_length, 3). Only the last trail_counts[row] points of a row are recorded. 
+        counts : np.ndarray
+            Shape (R,) number of recorded points per row. 
+        '''
+        length = self.trail_buffer.shape[1]
+        order = (self.trail_head + np.arange(length)) % max(length, 1)
+        return self.trail_buffer[:, order], self.trail_counts
+
     def update(self, dt): 
         '''Runs one step of our leapfrog integrator and updates the positions and velocities of every particle. 
-        Adds the positions of each object to their trail lists.
+        Writes the new positions of bodies with trails into the trail ring buffer.
 
         params
         ------
@@ -76,36 +250,79 @@ class Simulation:
             The time step applied to the integrator. 
         '''
         
-        if not self.star_objects: 
+        if not len(self.star_masses): 
             return
         
         
-        leapfrog_pos, leapfrog_vel = updateParticles(np.array(self.star_masses), 
-                                                     np.array(self.star_positions) * AU, 
-                                                     np.array(self.star_vels), 
+        leapfrog_pos, leapfrog_vel = updateParticles(self.star_masses, 
+                                                     self.star_positions * AU, 
+                                                     self.star_vels, 
                                                      dt)
         
-        for i, obj in enumerate(self.star_objects): 
-            px, py, pz = leapfrog_pos[i]
-            
-            obj.pos.x = px  / AU
-            obj.pos.y = py / AU
-            obj.pos.z = pz / AU 
-            obj.velocity = leapfrog_vel[i]
-            
+        self.star_positions = leapfrog_pos / AU
+        self.star_vels = leapfrog_vel
 
-            self.star_positions[i] = [obj.pos.x, obj.pos.y, obj.pos.z]
-            self.star_vels[i] = obj.velocity
+        profiler = self.profiler
+        if profiler: 
+            profiler.mark("physics")
 
-            
+        for obj in self.star_objects: 
+            obj.pos.x, obj.pos.y, obj.pos.z = self.star_positions[obj.index]
+            obj.velocity = self.star_vels[obj.index]
 
-            obj.trail_list.append([obj.pos.x, obj.pos.y, obj.pos.z])
+        if len(self.trail_index): 
+            length = self.trail_buffer.shape[1]
+            self.trail_buffer[:, self.trail_head] = self.star_positions[self.trail_index]
+            self.trail_head = (self.trail_head + 1) % length
+            self.trail_counts = np.minimum(self.trail_counts + 1, length)
 
-            if len(obj.trail_list) > obj.trail_length: 
-                obj.trail_list.pop(0)
+        if profiler: 
+            profiler.mark("trails")
 
+    def record(self, frames, dt, out = None): 
+        '''Runs frames steps of update and keeps the positions after each one, 
+        so frames can later be drawn in any order (see load_frame). 
 
+        params
+        ------
+        frames : int
+            Number of steps to run. 
+        dt : float
+            The time step applied to the integrator. 
+        out : np.ndarray, optional
+            Shape (frames, N, 3) array to write into, for example a memory-mapped .npy file. 
+
+        returns
+        -------
+        The trajectory, shape (frames, N, 3) in AU. 
+        '''
+        trajectory = out if out is not None else np.empty((frames, len(self.star_masses), 3))
+        for frame in range(frames): 
+            self.update(dt)
+            trajectory[frame] = self.star_positions
+        return trajectory
 
+    def load_frame(self, trajectory, frame): 
+        '''Sets every body and trail to where trajectory has them after step frame, as if 
+        update had been called frame + 1 times. Velocities are left untouched. 
 
+        params
+        ------
+        trajectory : np.ndarray
+            Shape (frames, N, 3) positions from record. 
+        frame : int
+            The step to load. 
+        '''
+        self.star_positions = np.array(trajectory[frame], dtype=np.float64)
 
+        for obj in self.star_objects: 
+            obj.pos.x, obj.pos.y, obj.pos.z = self.star_positions[obj.index]
 
+        if len(self.trail_index): 
+            length = self.trail_buffer.shape[1]
+            count = min(frame + 1, length)
+            # rebuild the ring with the head at 0, so the newest point sits at the end
+            self.trail_buffer[:] = 0
+            self.trail_buffer[:, length - count:] = np.swapaxes(trajectory[frame + 1 - count:frame + 1, self.trail_index], 0, 1)
+            self.trail_head = 0
+            self.trail_counts[:] = count
@@ -0,0 +1,264 @@
+import pygame
+import numpy as np
+from astronim.renderer import Renderer
+from astronim.objects.star import Star
+from astronim.objects.galaxy import Galaxy, galaxy_sprite_size
+
+
+class SplatRenderer(Renderer):
+    '''Renderer backend that accumulates star light into a float NumPy framebuffer.
+
+    -Every Star and every Galaxy star is splatted additively with a point-spread kernel
+     that matches the glow sprites of the per-object path (solid core, exp(-4t) falloff).
+    -Points are grouped by kernel size; small groups are splatted directly with one bincount,
+     big groups are deposited and convolved with the kernel by FFT, so the cost stops growing with N.
+    -The framebuffer is tone-mapped once and pushed to the screen with pygame.surfarray.
+    -Everything else (BlackHole, Text, Graph, LineBetween, trails) is drawn per object on top.
+
+    Attributes
+    ----------
+    exposure : float or None
+        None clips the accumulated light to [0, 1], which matches the per-object path wherever
+        stars don't overlap. A float uses 1 - exp(-exposure * light) instead, which keeps dense
+        cores from saturating.
+    max_direct : int
+        Largest number of (point, kernel pixel) pairs splatted directly before switching to FFT.
+
+    Methods
+    -------
+    draw(simulation):
+        Splats all stars, tone-maps, then draws the remaining objects.
+    '''
+    def __init__(self, screen, width, height, exposure = None, max_direct = 4_000_000, present = True, focal_length = None, clock = None):
+        super().__init__(screen, width, height, present, focal_length, clock)
+        self.exposure = exposure
+        self.max_direct = max_direct
+        self.framebuffer = np.zeros((width, height, 3), dtype=np.float32)
+        self._kernels = {}
+
+    def draw(self, simulation):
+        '''Render all objects in the given simulation to the screen.
+
+        params
+        ------
+        simulation : Simulation
+            The current simulation containing star_objects and static_objects.
+        '''
+        projection = self.projection()
+        self.framebuffer.fill(0)
+
+        stars = [obj for obj in simulation.star_objects if isinstance(obj, Star)]
+        others = [obj for obj in simulation.star_objects if not isinstance(obj, Star)]
+
+        if stars:
+            index = np.array([obj.index for obj in stars])
+            positions = simulation.star_positions[index]
+            base_radius = np.array([obj.base_radius for obj in stars])
+            colors = np.array([obj.color for obj in stars], dtype=np.float32)
+
+            dist = np.linalg.norm(positions - projection.camera, axis=1) + 1
+            radius = np.clip((base_radius * projection.depth / dist).astype(int), 2, max(2, int(20 * projection.pixel_scale)))
+            self.splat(projection, positions, colors, radius, radius * 8)
+
+        static_in_view = self.in_view(simulation.static_objects, projection)
+
+        for obj in static_in_view:
+            if isinstance(obj, Galaxy):
+                positions, colors = obj.world_points()
+                core, glow = galaxy_sprite_size(projection)
+                self.splat(projection, positions, colors.astype(np.float32), np.full(len(positions), core), np.full(len(positions), glow))
+
+        pygame.surfarray.blit_array(self.screen, self.tone_map(self.framebuffer))
+
+        self.project_trails(simulation, projection)
+
+        for obj in stars:
+            if obj.trail:
+                obj.set_camera(self.camera, self.rx, self.ry, projection, self.clock)
+                obj.draw_trail(self.screen, self.trail_path(obj))
+
+        for obj in others:
+            obj.set_camera(self.camera, self.rx, self.ry, projection, self.clock)
+            obj.draw(self.screen)
+            if obj.trail:
+                obj.draw_trail(self.screen, self.trail_path(obj))
+
+        for obj in static_in_view:
+            if not isinstance(obj, Galaxy):
+                obj.set_camera(self.camera, self.rx, self.ry, projection, self.clock)
+                obj.draw(self.screen)
+
+        if self.camera_movement_called:
+            self.camera_function(self.camera)
+
+        if self._owns_clock:
+            self.clock.tick()
+
+        profiler = self.profiler
+        if profiler:
+            profiler.mark("draw")
+            if profiler.hud:
+                profiler.draw_hud(self.screen)
+                profiler.mark("hud")
+
+        if self.present:
+            pygame.display.flip()
+        if profiler:
+            profiler.mark("flip")
+
+    def tone_map(self, light):
+        '''Maps accumulated light (0..1 per unit of color) to uint8.'''
+        if self.exposure is None:
+            light = np.minimum(light, 1.0)
+        else:
+            light = 1.0 - np.exp(-self.exposure * light)
+        return (light * 255).astype(np.uint8)
+
+    def kernel(self, radius, glow_radius):
+        '''(2g+1, 2g+1) point-spread kernel: 1 inside the core, exp(-4t) across the glow.'''
+        key = (radius, glow_radius)
+        if key not in self._kernels:
+            g = max(radius, glow_radius)
+            d = np.hypot(*np.mgrid[-g:g + 1, -g:g + 1])
+            t = (d - radius) / max(glow_radius - radius, 1)
+            k = np.where(d <= radius, 1.0, np.exp(-4 * t) * (d <= glow_radius))
+            self._kernels[key] = k.astype(np.float32)
+        return self._kernels[key]
+
+    def splat(self, projection, positions, colors, radius, glow_radius):
+        '''Projects world-space points and adds their light into the framebuffer.
+
+        params
+        ------
+        projection : Projection
+            The projection for this frame.
+        positions : np.ndarray
+            (N, 3) world-space positions.
+        colors : np.ndarray
+            (N, 3) colors in 0..255.
+        radius, glow_radius : np.ndarray
+            (N,) integer core and glow radius of every point, in pixels.
+        '''
+        xy, visible, _ = projection.project(positions)
+        g = np.maximum(radius, glow_radius)
+
+        # only points whose glow reaches the screen
+        on_screen = visible & (xy[:, 0] > -g) & (xy[:, 0] < self.width + g) \
+                            & (xy[:, 1] > -g) & (xy[:, 1] < self.height + g)
+        xy, colors, radius, glow_radius = xy[on_screen], colors[on_screen] / 255, radius[on_screen], glow_radius[on_screen]
+
+        groups = np.stack([radius, glow_radius], axis=1)
+        for r, gr in np.unique(groups, axis=0).tolist():
+            members = np.flatnonzero((radius == r) & (glow_radius == gr))
+            k = self.kernel(r, gr)
+            if len(members) * np.count_nonzero(k) <= self.max_direct:
+                self._splat_direct(xy[members], colors[members], k)
+            else:
+                self._splat_fft(xy[members], colors[members], k)
+
+    def _splat_direct(self, xy, colors, k):
+        '''Adds every (point, kernel pixel) pair with one bincount per channel.'''
+        g = k.shape[0] // 2
+        dx, dy = np.nonzero(k)
+        weights = k[dx, dy]
+        dx, dy = dx - g, dy - g
+
+        x = (xy[:, 0:1] + dx).ravel()
+        y = (xy[:, 1:2] + dy).ravel()
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        flat = (x * self.height + y)[inside]
+
+        fb = self.framebuffer.reshape(-1, 3)
+        for ch in range(3):
+            w = (colors[:, ch:ch + 1] * weights).ravel()[inside]
+            fb[:, ch] += np.bincount(flat, weights=w, minlength=len(fb)).astype(np.float32)
+
+    def _splat_fft(self, xy, colors, k):
+        '''Deposits point centers on a padded canvas and convolves them with the kernel.'''
+        g = k.shape[0] // 2
+        w, h = fft_size(self.width + 2 * g), fft_size(self.height + 2 * g)
+        flat = (xy[:, 0] + g) * h + (xy[:, 1] + g)
+
+        deposit = np.stack([np.bincount(flat, weights=colors[:, ch], minlength=w * h) for ch in range(3)])
+        deposit = deposit.reshape(3, w, h)
+
+        key = (k.shape[0], id(k), w, h)
+        if key not in self._kernels:
+            # kernel centered on (0, 0); anything that wraps around lands in the cropped padding
+            kernel = np.zeros((w, h), dtype=np.float64)
+            kernel[:2 * g + 1, :2 * g + 1] = k
+            self._kernels[key] = np.fft.rfft2(np.roll(kernel, (-g, -g), axis=(0, 1)))
+
+        light = np.fft.irfft2(np.fft.rfft2(deposit) * self._kernels[key], s=(w, h))
+        self.framebuffer += np.maximum(light[:, g:g + self.width, g:g + self.height], 0).transpose(1, 2, 0)
+
+
+def fft_size(n):
+    '''Smallest size >= n with no prime factors above 5, which keeps the FFTs fast.'''
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+def compare_renderers(simulation, width, height, camera = None, rx = 0, ry = 0, candidate = SplatRenderer, 
+                      full_detail = True, **kwargs):
+    '''Renders one frame of a simulation with the per-object Renderer and with a candidate backend
+    and measures how far apart the two images are.
+
+    params
+    ------
+    simulation : Simulation
+        The scene to render.
+    width, height : int
+        Size of both renders.
+    camera : Vec3, optional
+        Camera position, defaults to the origin.
+    rx, ry : float
+        Camera rotation.
+    candidate : type
+        Renderer class to compare against Renderer. kwargs are passed to it.
+    full_detail : bool
+        Draw every galaxy star on the Renderer side, with its LOD, billboard and impostor paths
+        turned off, so the comparison measures the backend and not the galaxy LOD. SplatRenderer
+        always splats every star.
+
+    returns
+    -------
+    dict with the mean absolute error, max absolute error and RMSE (in 0..255 units), the PSNR in dB
+    and the fraction of pixels that differ by more than 8 levels in any channel.
+
+    python -m benchmarks.quality runs this over a set of scenes and fails when the PSNR drops below
+    the minimum set for each one (38 dB for isolated stars, less where glows overlap).
+    '''
+    galaxies = [obj for obj in simulation.static_objects if isinstance(obj, Galaxy)] if full_detail else []
+    saved = [(galaxy.lod_pixels, galaxy.billboard_pixels, galaxy.impostor_pixels) for galaxy in galaxies]
+
+    images = []
+    for backend, backend_kwargs in ((Renderer, {}), (candidate, kwargs)):
+        surface = pygame.Surface((width, height))
+        renderer = backend(surface, width, height, present=False, **backend_kwargs)
+        if camera is not None:
+            renderer.camera.x, renderer.camera.y, renderer.camera.z = camera.x, camera.y, camera.z
+        renderer.rx, renderer.ry = rx, ry
+        for galaxy in galaxies:
+            galaxy.lod_pixels = galaxy.billboard_pixels = galaxy.impostor_pixels = 0
+        try:
+            renderer.draw(simulation)
+        finally:
+            for galaxy, (lod, billboard, impostor) in zip(galaxies, saved):
+                galaxy.lod_pixels, galaxy.billboard_pixels, galaxy.impostor_pixels = lod, billboard, impostor
+        images.append(pygame.surfarray.array3d(surface).astype(np.float64))
+
+    diff = np.abs(images[0] - images[1])
+    rmse = float(np.sqrt(np.mean(diff ** 2)))
+    return {
+        "mean_abs_error": float(diff.mean()),
+        "max_abs_error": float(diff.max()),
+        "rmse": rmse,
+        "psnr": float(20 * np.log10(255 / rmse)) if rmse else float("inf"),
+        "pixels_off": float(np.mean(diff.max(axis=2) > 8)),
+    }
@@ -1,7 +1,12 @@
+import os
 import pygame
 from astronim.simulation import Simulation
 from astronim.renderer import Renderer
 from astronim.recorder import Recorder
+from astronim.clock import FrameClock
+from astronim.parallel import render_parallel, CameraTrack
+from astronim.profiler import Profiler
+from astronim.objects.text import clear_font_cache
 from astronim.utils.tools import Vec3 
 import numpy as np
 
@@ -9,7 +14,7 @@ import numpy as np
 class Universe:
     """Handles the core loop of astronim. 
 
-        -Initializes pygame and the rendering window. 
+        -Initializes pygame and the rendering window, or an offscreen surface when headless. 
         -Manages the simulation and updates bodies. 
         -Runs the renderer (camera, drawing, depth sorting)
         -Records frames to an output .mp4 file using recorder. 
@@ -20,6 +25,10 @@ class Universe:
         screen : pygame.Surface
             The pygame screen that the simulation will draw on. 
 
+        headless : bool
+            Draws into a plain pygame.Surface instead of a window. No display is opened, 
+            no input is read, and frames are produced as fast as the CPU allows. 
+
         simulation : Simulation
             Contains all the objects in the scene and update logic
 
@@ -28,12 +37,20 @@ class Universe:
 
         recorder : Recorder
             Captures screen frame-by-frame and uses ffmpeg to save video to a specified output file. 
+            Passing outputs (a list of OutputSpec) encodes several videos, for example a 4K master and 
+            an HD preview, from the same render. With segment_frames the video is encoded in segments 
+            as it renders, and main_loop resumes after the last complete one. 
 
         running : bool
             Main loop will run while true. 
 
-        clock : pygame.time.Clock
-            Controls frame timing
+        clock : FrameClock
+            Frame and simulated time of the frame being drawn. Shared with the renderer, which 
+            hands it to every object so animations advance per frame, not per second of wall time. 
+
+        profiler : Profiler
+            Per-phase frame timings. Disabled unless profile is True; F3 toggles the on-screen HUD 
+            (and enables profiling). Reports are written next to the video when the loop ends. 
 
         speed : float
             Controls fly control speeds. 
@@ -46,33 +63,55 @@ class Universe:
         handle_events(): 
             Processes pygame events. 
 
-        main_loop(): 
+        main_loop(frames, duration): 
             Runs the simulation, rendering, and recording. Must be called in any project file. 
 
         controls():
             Handles all the controls for moving through the scene (WASD, space, ctrl, shift)
 
+        render_parallel(frames, duration, camera_path, workers): 
+            Renders the scene offline across worker processes, see astronim.parallel. 
+
     """
-    def __init__(self, width: int = 1920, height: int = 1080, output_file: str =  "output"):
+    def __init__(self, width: int = 1920, height: int = 1080, output_file: str =  "output", headless: bool = False, 
+                 outputs: list = None, segment_frames: int = None, profile: bool = False):
 
+        self.headless = headless
+        if headless: 
+            # pygame still needs a video driver for surfaces and fonts, the dummy one never opens a window
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
 
         pygame.init()
-        self.screen = pygame.display.set_mode((width, height))
-        pygame.display.set_caption('Astronim')
+        # fonts cached by an earlier Universe died with its pygame.quit()
+        clear_font_cache()
+        if headless: 
+            self.screen = pygame.Surface((width, height))
+        else: 
+            self.screen = pygame.display.set_mode((width, height))
+            pygame.display.set_caption('Astronim')
+
+        self.output_file = output_file 
+        self.clock = FrameClock(fps = 60)
 
         self.simulation = Simulation()
-        self.renderer = Renderer(self.screen, width, height)
-        self.recorder = Recorder()
+        self.renderer = Renderer(self.screen, width, height, present = not headless, clock = self.clock)
+        # segments live next to the output so an interrupted render can resume from them
+        segment_dir = self.video_file() + ".segments" if segment_frames else None
+        self.recorder = Recorder(fps = self.clock.fps, outputs = outputs, 
+                                 segment_frames = segment_frames, segment_dir = segment_dir)
+
+        self.profiler = Profiler(enabled = profile)
+        self.simulation.profiler = self.renderer.profiler = self.recorder.profiler = self.profiler
 
         self.running = True
-        self.clock = pygame.time.Clock()
 
         self.speed = 0.2
         self.shift_speed_factor = 10
 
-        self.output_file = output_file 
         self.static_mouse = False
 
+        self.dt = 0.1 * 86400 # seconds per frame
+
         
     def handle_events(self):
         '''
@@ -81,41 +120,126 @@ class Universe:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3: 
+                self.profiler.hud = not self.profiler.hud
+                self.profiler.enabled = self.profiler.enabled or self.profiler.hud
 
 
 
-    def main_loop(self):
+    def main_loop(self, frames: int = None, duration: float = None):
         '''
         The main loop that updates our simulation, draws to the screen, and records the scene. 
+
+        params
+        ------
+        frames : int, optional
+            Stop after this many frames. 
+        duration : float, optional
+            Stop once this much simulated time (seconds) has passed. 
+            Headless runs have no window to close, so they need frames or duration. 
         '''
+        if self.headless and frames is None and duration is None: 
+            raise ValueError("A headless main_loop needs frames or duration to know when to stop")
+
+        if self.recorder.recording and self.recorder.resume_frames: 
+            self.fast_forward(self.recorder.resume_frames)
+            if (frames is not None and self.clock.frame >= frames) or (duration is not None and self.clock.sim_time >= duration): 
+                self.running = False
+
+        profiler = self.profiler
         while self.running:
-            self.dt = 0.1 * 86400 # seconds per frame
-            # self.clock.tick(60) # seconds per frame
-            self.handle_events()
+            if profiler.enabled: 
+                profiler.begin_frame()
+
+            if not self.headless: 
+                self.handle_events()
 
 
-            keys = pygame.key.get_pressed()
-            self.controls(keys)
+                keys = pygame.key.get_pressed()
+                self.controls(keys)
 
 
-            if not self.static_mouse:
-                dx, dy = pygame.mouse.get_rel()
-                self.renderer.rx += np.radians(dx / 5)
-                self.renderer.ry -= np.radians(dy / 5)
+                if not self.static_mouse:
+                    dx, dy = pygame.mouse.get_rel()
+                    self.renderer.rx += np.radians(dx / 5)
+                    self.renderer.ry -= np.radians(dy / 5)
+
+            if profiler: 
+                profiler.mark("events")
 
             self.simulation.update(self.dt)
             self.renderer.draw(self.simulation)
             self.recorder.save_frame(self.screen)
+            if profiler: 
+                profiler.end_frame()
+
+            self.clock.tick(self.dt)
+            if (frames is not None and self.clock.frame >= frames) or (duration is not None and self.clock.sim_time >= duration): 
+                self.running = False
 
         pygame.quit()
-        if self.output_file[-3:] == '.mp4':
-            self.recorder.stop(output_file=self.output_file)
-        else:
-            self.recorder.stop(output_file=self.output_file + '.mp4')
+        self.recorder.stop(output_file=self.video_file())
+
+        if self.profiler.frames: 
+            self.profiler.dump(self.video_file()[:-4] + ".profile.json")
+            self.profiler.dump(self.video_file()[:-4] + ".profile.csv")
+
+    def video_file(self): 
+        '''output_file with the .mp4 extension.'''
+        if self.output_file[-4:] == '.mp4':
+            return self.output_file
+        return self.output_file + '.mp4'
+
+    def fast_forward(self, frames): 
+        '''
+        Advances the simulation, camera animation and clock by frames without drawing, to pick up 
+        a resumed recording where it stopped. 
+        '''
+        for _ in range(frames): 
+            self.simulation.update(self.dt)
+            if self.renderer.camera_movement_called: 
+                self.renderer.camera_function(self.renderer.camera)
+            self.clock.tick(self.dt)
         
         
 
     
+    def render_parallel(self, frames: int = None, duration: float = None, camera_path = None, workers: int = None):
+        '''
+        Renders the scene offline with a pool of headless workers instead of running main_loop. 
+        Must be called before the scene is drawn. 
+
+        params
+        ------
+        frames : int, optional
+            Number of frames to render. 
+        duration : float, optional
+            Simulated seconds to render, used when frames is not given. 
+        camera_path : callable, optional
+            camera_path(frame) returns (camera, rx, ry), see astronim.parallel.render_parallel. 
+            Defaults to the renderer's current camera, moved by its camera_animation as main_loop would. 
+        workers : int, optional
+            Number of processes, defaults to the number of CPUs. 
+
+        The recorder's outputs are produced, and with segment_frames the finished blocks are kept 
+        next to the video so an interrupted render picks up where it stopped. 
+        '''
+        if frames is None: 
+            if duration is None: 
+                raise ValueError("render_parallel needs frames or duration")
+            frames = int(np.ceil(duration / self.dt))
+
+        if camera_path is None: 
+            renderer = self.renderer
+            camera_path = CameraTrack.record(renderer.camera, renderer.rx, renderer.ry, frames, 
+                                             renderer.camera_function if renderer.camera_movement_called else None)
+
+        return render_parallel(self.simulation, frames, self.dt, self.renderer.width, self.renderer.height, 
+                               output_file = self.video_file(), camera_path = camera_path, workers = workers, 
+                               fps = self.clock.fps, focal_length = self.renderer.focal_length, 
+                               renderer = type(self.renderer), outputs = self.recorder.outputs, 
+                               segment_frames = self.recorder.segment_frames, segment_dir = self.recorder.segment_dir)
+
     def controls(self, keys):
         '''
         Handles all of the pygame controls to move through the scene. 
@@ -0,0 +1,175 @@
+import numpy as np
+from itertools import islice
+from astronim.utils.constants import AU, MSUN, PC, LY
+
+
+#Fields every catalog row has to provide, in the order used for plain 2D arrays
+FIELDS = ("mass", "x", "y", "z", "vx", "vy", "vz")
+
+#Conversion factors into the units the simulation works in (kg, AU, m/s)
+MASS_UNITS = {"kg": 1.0, "g": 1e-3, "msun": MSUN}
+LENGTH_UNITS = {"au": 1.0, "m": 1 / AU, "km": 1e3 / AU, "pc": PC / AU, "ly": LY / AU}
+VELOCITY_UNITS = {"m/s": 1.0, "km/s": 1e3, "au/day": AU / 86400}
+
+DEFAULT_UNITS = {"mass": "kg", "position": "au", "velocity": "m/s"}
+
+
+def unit_factors(units=None):
+    '''
+    Converts a units mapping into one multiplicative factor per field.
+
+    Parameters
+    ----------
+    units : dict, optional
+        Maps "mass", "position" and "velocity" to either a unit name
+        (see MASS_UNITS, LENGTH_UNITS and VELOCITY_UNITS) or a number to multiply by.
+        Missing entries default to kg, AU and m/s.
+
+    Returns
+    -------
+    factors : np.ndarray
+        1D array of 7 factors, in the order of FIELDS.
+    '''
+    units = {**DEFAULT_UNITS, **(units or {})}
+    tables = {"mass": MASS_UNITS, "position": LENGTH_UNITS, "velocity": VELOCITY_UNITS}
+
+    factors = {}
+    for kind, table in tables.items():
+        unit = units[kind]
+        if isinstance(unit, str):
+            if unit.lower() not in table:
+                raise ValueError(f"Unknown {kind} unit '{unit}', expected one of {list(table)}")
+            factors[kind] = table[unit.lower()]
+        else:
+            factors[kind] = float(unit)
+
+    return np.array([factors["mass"]] + [factors["position"]] * 3 + [factors["velocity"]] * 3)
+
+
+def _resolve_columns(names, columns=None):
+    '''Returns the column index (into names) of each field in FIELDS.'''
+    columns = {**{field: field for field in FIELDS}, **(columns or {})}
+    indices = []
+    for field in FIELDS:
+        col = columns[field]
+        if isinstance(col, (int, np.integer)):
+            indices.append(int(col))
+        elif col in names:
+            indices.append(names.index(col))
+        else:
+            raise KeyError(f"Column '{col}' for field '{field}' not found in catalog columns {names}")
+    return indices
+
+
+def _split(block, factors):
+    '''Splits an (n, 7) block into converted masses, positions and velocities.'''
+    block = block * factors
+    return block[:, 0], block[:, 1:4], block[:, 4:7]
+
+
+def iter_catalog(path, columns=None, units=None, chunksize=65536, delimiter=","):
+    '''
+    Reads initial conditions from a catalog file in chunks.
+
+    .npy files are memory-mapped, so only one chunk is ever held in memory. They can either be
+    a structured array (fields are looked up by name) or a plain 2D array (fields are looked up
+    by column index, defaulting to the order of FIELDS).
+    .npz files hold one 1D array per column, looked up by name.
+    .csv (or any other text) files need a header row and are parsed chunksize rows at a time.
+
+    Parameters
+    ----------
+    path : str
+        Path to the catalog file.
+
+    columns : dict, optional
+        Maps the fields "mass", "x", "y", "z", "vx", "vy", "vz" to a column name or index.
+        Fields not listed are looked up under their own name.
+
+    units : dict, optional
+        Units of the catalog columns, see unit_factors.
+
+    chunksize : int
+        Number of rows to read at a time.
+
+    delimiter : str
+        Column delimiter for text files.
+
+    Yields
+    ------
+    masses, positions, velocities : (np.ndarray, np.ndarray, np.ndarray)
+        Shapes (n,), (n, 3) and (n, 3) in kg, AU and m/s.
+    '''
+    factors = unit_factors(units)
+    path = str(path)
+
+    if path.endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        if data.dtype.names:
+            names = list(data.dtype.names)
+            fields = [names[i] for i in _resolve_columns(names, columns)]
+            for start in range(0, len(data), chunksize):
+                chunk = data[start:start + chunksize]
+                yield _split(np.stack([chunk[f] for f in fields], axis=1).astype(np.float64), factors)
+        else:
+            indices = _resolve_columns(list(FIELDS), columns)
+            for start in range(0, len(data), chunksize):
+                yield _split(np.asarray(data[start:start + chunksize][:, indices], dtype=np.float64), factors)
+
+    elif path.endswith(".npz"):
+        # npz members cannot be memory-mapped, but each one is only loaded when accessed
+        with np.load(path) as archive:
+            names = list(archive.files)
+            arrays = [archive[names[i]] for i in _resolve_columns(names, columns)]
+            for start in range(0, len(arrays[0]), chunksize):
+                yield _split(np.stack([a[start:start + chunksize] for a in arrays], axis=1).astype(np.float64), factors)
+
+    else:
+        with open(path) as f:
+            names = [name.strip() for name in f.readline().split(delimiter)]
+            indices = _resolve_columns(names, columns)
+            while True:
+                lines = list(islice(f, chunksize))
+                if not lines:
+                    break
+                block = np.loadtxt(lines, delimiter=delimiter, usecols=indices, ndmin=2, dtype=np.float64)
+                yield _split(block, factors)
+
+
+def load_catalog(path, columns=None, units=None, chunksize=65536, delimiter=","):
+    '''
+    Reads a whole catalog into arrays, see iter_catalog for the supported formats.
+
+    For .npy/.npz catalogs the output arrays are allocated once up front and filled chunk by chunk.
+
+    Returns
+    -------
+    masses, positions, velocities : (np.ndarray, np.ndarray, np.ndarray)
+        Shapes (N,), (N, 3) and (N, 3) in kg, AU and m/s.
+    '''
+    chunks = iter_catalog(path, columns, units, chunksize, delimiter)
+
+    n = _count_rows(str(path))
+    if n is None:
+        chunks = list(chunks)
+        if not chunks:
+            return np.zeros(0), np.zeros((0, 3)), np.zeros((0, 3))
+        return tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+    masses, positions, velocities = np.empty(n), np.empty((n, 3)), np.empty((n, 3))
+    start = 0
+    for m, p, v in chunks:
+        stop = start + len(m)
+        masses[start:stop], positions[start:stop], velocities[start:stop] = m, p, v
+        start = stop
+    return masses, positions, velocities
+
+
+def _count_rows(path):
+    '''Number of rows in a binary catalog, or None for text catalogs.'''
+    if path.endswith(".npy"):
+        return len(np.load(path, mmap_mode="r"))
+    if path.endswith(".npz"):
+        with np.load(path) as archive:
+            return len(archive[archive.files[0]])
+    return None
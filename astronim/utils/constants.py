@@ -1,7 +1,14 @@
 #Settings
-WIDTH = 3840 #1920
-HEIGHT =  2160 #1080
+#Default viewport for projections made without a Renderer, Renderer uses its own width and height
+WIDTH = 1920
+HEIGHT = 1080
 DEPTH = 500
 
+#Screen height at which the focal length is DEPTH pixels, other heights scale it to keep the same framing
+REFERENCE_HEIGHT = 1080
+
 G = 6.674e-11
-AU = 1.496e11
\ No newline at end of file
+AU = 1.496e11
+MSUN = 1.989e30
+PC = 3.0857e16
+LY = 9.4607e15
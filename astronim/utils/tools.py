@@ -2,12 +2,7 @@
 import numpy as np
 import math
 from dataclasses import dataclass
-
-
-#Settings
-WIDTH = 1200
-HEIGHT = 800
-DEPTH = 500
+from astronim.utils.constants import WIDTH, HEIGHT, DEPTH
 
 
 # Vec3 Class
@@ -29,16 +24,182 @@ def rotation_matrix(theta):
     return np.array([[np.cos(theta), -np.sin(theta)], 
                         [np.sin(theta), np.cos(theta)]])
 
+def camera_rotation(rx, ry): 
+    '''
+    Builds the 3x3 matrix that applies both rotations of get_2d at once 
+    (first about the x-axis in the x-z plane, then about the y-axis in the y-z plane). 
+
+    parameters
+    ----------
+    rx : float
+        rotation angle about x-axis, in radians
+    ry : float
+        rotation angle about y-axis, in radians
+
+    returns
+    -------
+    3x3 np.ndarray rotation matrix. 
+    '''
+    (c1, s1), (c2, s2) = (np.cos(rx), np.sin(rx)), (np.cos(ry), np.sin(ry))
+
+    horizontal = np.array([[c1, 0, -s1], 
+                           [0,  1,   0], 
+                           [s1, 0,  c1]])
+    vertical = np.array([[1,  0,   0], 
+                         [0, c2, -s2], 
+                         [0, s2,  c2]])
+    return vertical @ horizontal
+
+
+def euler_rotation(ax, ay, az): 
+    '''
+    3x3 rotation about the x, then y, then z axis. 
+
+    parameters
+    ----------
+    ax, ay, az : float
+        rotation angles in radians
+
+    returns
+    -------
+    3x3 np.ndarray rotation matrix. 
+    '''
+    (cx, sx), (cy, sy), (cz, sz) = [(np.cos(a), np.sin(a)) for a in (ax, ay, az)]
+
+    x = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    y = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    z = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return z @ y @ x
+
+
+class Projection: 
+    '''
+    Projects batches of 3D points onto the screen for one camera setup. 
+    The renderer builds one of these per frame so the camera rotation is only computed once, 
+    every object then projects all of its points with a single matrix multiply. 
+
+    Attributes
+    ----------
+    camera : np.ndarray
+        The camera position as a length 3 array. 
+    rotation : np.ndarray
+        3x3 camera rotation, see camera_rotation. 
+    width, height : int
+        Size of the screen that points are projected onto. 
+    depth : float
+        Focal length of the perspective projection, in pixels. 
+    pixel_scale : float
+        depth / DEPTH. Pixel sizes tuned at the reference focal length (glows, sprite radii, margins) 
+        are multiplied by this, so a preview and a full-size render have the same framing. 
+    near : float
+        Points with a camera-space depth at or below this are behind the camera. 
+    '''
+    def __init__(self, camera, rx, ry, width = WIDTH, height = HEIGHT, depth = DEPTH, near = 0.1): 
+        self.camera = np.array([camera.x, camera.y, camera.z], dtype=np.float64)
+        self.rotation = camera_rotation(rx, ry)
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.pixel_scale = depth / DEPTH
+        self.near = near
+
+    def to_camera(self, points): 
+        '''Moves (M, 3) world-space points into camera space.'''
+        return (np.asarray(points, dtype=np.float64).reshape(-1, 3) - self.camera) @ self.rotation.T
+
+    def project_camera(self, cam): 
+        '''
+        Perspective-projects (M, 3) camera-space points. 
+
+        returns
+        -------
+        xy : np.ndarray
+            (M, 2) integer screen coordinates. Only meaningful where visible is True. 
+        visible : np.ndarray
+            (M,) boolean mask of points in front of the camera. 
+        depth : np.ndarray
+            (M,) camera-space depth of every point. 
+        '''
+        z = cam[:, 2]
+        visible = z > self.near
+        scale = self.depth / np.where(visible, z, 1.0)
+
+        xy = np.empty((len(cam), 2), dtype=np.int64)
+        xy[:, 0] = cam[:, 0] * scale + self.width / 2
+        xy[:, 1] = self.height / 2 - cam[:, 1] * scale
+        return xy, visible, z
+
+    def project(self, points): 
+        '''Projects (M, 3) world-space points, see project_camera for the return values.'''
+        return self.project_camera(self.to_camera(points))
+
+    def project_instance(self, local, linear, translation): 
+        '''
+        Projects points of an instanced object whose world positions are local @ linear.T + translation. 
+        The instance transform is folded into the camera transform, so it costs one 3x3 product per instance. 
+        '''
+        matrix = self.rotation @ linear
+        offset = self.rotation @ (np.asarray(translation, dtype=np.float64) - self.camera)
+        return self.project_camera(np.asarray(local) @ matrix.T + offset)
+
+    def spheres_visible(self, centers, radii, margin = 0): 
+        '''
+        Frustum test for (M, 3) world-space bounding spheres. 
+
+        parameters
+        ----------
+        centers : np.ndarray
+            (M, 3) sphere centers. 
+        radii : np.ndarray
+            (M,) sphere radii in world units. 
+        margin : float
+            Extra screen border in pixels, for things like glows that reach past an object's sphere. 
+
+        returns
+        -------
+        (M,) boolean mask, False only for spheres entirely outside the view. 
+        '''
+        x, y, z = self.to_camera(centers).T
+        tx = (self.width / 2 + margin) / self.depth
+        ty = (self.height / 2 + margin) / self.depth
+
+        # signed distances to the near plane and to the side planes |x| = z * tx, |y| = z * ty
+        return ((z + radii > self.near) 
+                & ((np.abs(x) - z * tx) / np.sqrt(1 + tx**2) <= radii) 
+                & ((np.abs(y) - z * ty) / np.sqrt(1 + ty**2) <= radii))
+
+    def screen_radius(self, center, radius): 
+        '''Apparent radius in pixels of a sphere at a world-space center (length 3 array).'''
+        z = self.to_camera(center)[0, 2]
+        if z <= self.near: 
+            return np.inf
+        return radius * self.depth / z
+
+    def project_point(self, pos): 
+        '''
+        Projects a single world-space Vec3, like get_2d does for camera-relative points. 
+
+        returns
+        -------
+        (x, y) integer screen coordinates, or None when the point is behind the camera. 
+        '''
+        xy, visible, _ = self.project([[pos.x, pos.y, pos.z]])
+        if not visible[0]: 
+            return None
+        return tuple(xy[0].tolist())
+
+
 #Getting 2d Point coordinates from 3d vectors
 def get_2d(pos, rx, ry): 
 
     '''
     Takes 3D coordinates and converts them into 2d. 
+    For more than one point use Projection, which projects whole arrays at once. 
 
     parameters
     ----------
     pos : Vec3
-        3 dimensional vector containing x, y, z coordinates respectively. 
+        3 dimensional vector containing x, y, z coordinates respectively, relative to the camera. 
     rx : float
         rotation angle about x-axis, in radians
     ry : float
@@ -55,25 +216,122 @@ def get_2d(pos, rx, ry):
     And here under "Weak perspective projection" for depth stuff: 
     https://en.m.wikipedia.org/wiki/3D_projection 
     '''
+    return Projection(Vec3(0, 0, 0), rx, ry).project_point(pos)
 
-    #horizonatl rotation (about x-axis)
-    pos.x, pos.z = np.matmul(rotation_matrix(rx), np.array([pos.x, pos.z]))
 
-    #vertical rotation (about y-axis)
-    pos.y, pos.z = np.matmul(rotation_matrix(ry), np.array([pos.y, pos.z]))
+def decimate_polyline(points, tolerance = 1.0, max_gap = 64): 
+    '''
+    Adaptive pixel-distance decimation in one vectorized pass. 
 
-    #Get rid of points behind the camera
-    if pos.z <= 0.1: 
-        return None
-    
-    pos.x = pos.x* DEPTH/pos.z
-    pos.y = pos.y * DEPTH / pos.z
+    A chord of length s across a bend of curvature k strays about s**2 * k / 8 from the path, 
+    so walking along the polyline we keep points sqrt(8 * tolerance / k) pixels apart: 
+    dense through tight turns, sparse (up to max_gap) along straight stretches. 
 
-    pos.x += WIDTH / 2
-    pos.y = HEIGHT / 2 - pos.y
+    parameters
+    ----------
+    points : np.ndarray
+        (M, 2) screen points. 
+    tolerance : float
+        Roughly how far, in pixels, the result may stray from the original. 
+    max_gap : float
+        Largest spacing between kept points, in pixels. 
 
-    
-    return (int(pos.x), int(pos.y))
+    returns
+    -------
+    (K, 2) np.ndarray of the kept points, always including the first and last. 
+    '''
+    points = np.asarray(points)
+    if len(points) < 3: 
+        return points
+
+    # repeated pixels carry no shape
+    moved = np.empty(len(points), dtype=bool)
+    moved[0] = True
+    moved[1:] = np.any(points[1:] != points[:-1], axis=1)
+    points = points[moved]
+    if len(points) < 3: 
+        return points
+
+    steps = np.diff(points, axis=0).astype(np.float64)
+    length = np.hypot(steps[:, 0], steps[:, 1])
+
+    # curvature at each interior point: turning angle over the local step length
+    heading = np.arctan2(steps[:, 1], steps[:, 0])
+    turn = np.abs((np.diff(heading) + np.pi) % (2 * np.pi) - np.pi)
+    curvature = turn / ((length[:-1] + length[1:]) / 2)
+    curvature = np.maximum(np.concatenate([[0.0], curvature]), np.concatenate([curvature, [0.0]]))
+
+    density = np.maximum(np.sqrt(curvature / (8 * tolerance)), 1 / max_gap)
+    travelled = np.concatenate([[0.0], np.cumsum(length * density)])
+    bucket = np.floor(travelled).astype(np.int64)
+
+    keep = np.empty(len(points), dtype=bool)
+    keep[0] = True
+    keep[1:] = bucket[1:] != bucket[:-1]
+    keep[-1] = True
+    return points[keep]
+
+
+def douglas_peucker(points, tolerance = 1.0): 
+    '''
+    Simplifies a polyline so it stays within tolerance pixels of the original. 
+    All spans of one recursion level are split together, so each level is a handful of array passes. 
+
+    https://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm
+
+    parameters
+    ----------
+    points : np.ndarray
+        (M, 2) screen points. 
+    tolerance : float
+        Largest allowed distance from the original polyline, in pixels. 
+
+    returns
+    -------
+    (K, 2) np.ndarray of the kept points. 
+    '''
+    points = np.asarray(points)
+    if len(points) < 3: 
+        return points
+
+    p = points.astype(np.float64)
+    keep = np.zeros(len(p), dtype=bool)
+    keep[0] = keep[-1] = True
+    index = np.arange(len(p) - 1)
+
+    while True: 
+        kept = np.flatnonzero(keep)
+
+        # the span every point belongs to, and its distance to that span's chord
+        span = np.searchsorted(kept, index, side='right') - 1
+        start, end = p[kept[span]], p[kept[span + 1]]
+        chord = end - start
+        rel = p[:-1] - start
+        length = np.hypot(chord[:, 0], chord[:, 1])
+        cross = np.abs(chord[:, 0] * rel[:, 1] - chord[:, 1] * rel[:, 0])
+        dist = np.where(length > 0, cross / np.where(length > 0, length, 1), np.hypot(rel[:, 0], rel[:, 1]))
+        dist[keep[:-1]] = 0
+
+        # split every span at its farthest point, if that is out of tolerance
+        span_max = np.maximum.reduceat(dist, kept[:-1])
+        split = (dist > tolerance) & (dist == span_max[span])
+        if not split.any(): 
+            break
+        first = np.unique(span[split], return_index=True)[1]
+        keep[np.flatnonzero(split)[first]] = True
+
+    return points[keep]
+
+
+def simplify_polyline(points, tolerance = 1.0, exact = False): 
+    '''
+    Screen-space simplification for drawing: adaptive decimation, which is a single array pass 
+    but only roughly keeps to the tolerance. exact runs douglas_peucker on the original points 
+    instead, which guarantees the tolerance but costs a few passes per recursion level. 
+    '''
+    if exact: 
+        return douglas_peucker(points, tolerance)
+    return decimate_polyline(points, tolerance)
 
 
 def gaussianRandom(mean = 0, stdev =1): 
@@ -95,6 +353,19 @@ def spiral(x, y, z, offset, ARM_X_DIST = 100, SPIRAL = 3.0):
     theta += (r / ARM_X_DIST) * SPIRAL
     return Vec3(r * math.cos(theta), r * math.sin(theta), z)
 
+def spiral_points(x, y, z, offset, ARM_X_DIST = 100, SPIRAL = 3.0):
+    '''
+    Vectorized spiral: twists arrays of x, y by an angle growing with radius. 
+
+    returns
+    -------
+    (N, 3) np.ndarray of the twisted points. 
+    '''
+    r = np.sqrt(x**2 + y**2)
+    # arctan2 matches atan(y / x) (+ pi for x <= 0) up to a full turn
+    theta = offset + np.arctan2(y, x) + (r / ARM_X_DIST) * SPIRAL
+    return np.column_stack([r * np.cos(theta), r * np.sin(theta), z])
+
 def distance(obj_pos_3d, camera):
     dx = obj_pos_3d.x - camera.x
     dy = obj_pos_3d.y - camera.y
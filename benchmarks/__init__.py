@@ -0,0 +1,23 @@
+'''Headless benchmarks for the hot paths of astronim.
+
+Run from the repository root:
+
+    python -m benchmarks.run --save-baseline    # once, on the reference machine, then commit baseline.json
+    python -m benchmarks.run                    # after a change, writes benchmarks/results/latest.json
+    python -m benchmarks.compare                # baseline.json against latest.json
+
+The baseline only means something on the machine that recorded it: record it again (and commit it)
+when the reference machine or the set of cases changes. compare notes differing commit, machine,
+CPU count or --quick between the two files.
+
+-benchmarks.physics: calculateForceVectors and updateParticles across N.
+-benchmarks.render: Renderer.draw across star and galaxy counts at several resolutions.
+-benchmarks.glow: glow sprite builds (cache misses) and cached glow blits.
+-benchmarks.recorder: frame capture, PNG saving and streamed encoding throughput.
+
+python -m benchmarks.quality is not a timing benchmark: it checks SplatRenderer's output against the
+per-object Renderer (PSNR per scene, see astronim.splat_renderer.compare_renderers).
+
+run writes one JSON file with the timing of every case; compare matches two such files case by case
+and exits with status 1 when any case got slower than the threshold allows.
+'''
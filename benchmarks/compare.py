@@ -0,0 +1,99 @@
+import os
+import json
+import argparse
+
+
+#results of the reference machine, recorded with python -m benchmarks.run --save-baseline
+BASELINE = os.path.join("benchmarks", "results", "baseline.json")
+#where benchmarks.run writes by default
+LATEST = os.path.join("benchmarks", "results", "latest.json")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold = 0.10, min_ms = 0.05):
+    '''Matches the cases of two benchmark reports by key and compares their median times.
+
+    A case regresses when its median grew by more than threshold (relative) and by more than
+    min_ms (absolute), so sub-microsecond noise on tiny cases isn't flagged.
+
+    params
+    ------
+    baseline, current : dict
+        Reports written by benchmarks.run.
+    threshold : float
+        Allowed relative slowdown, 0.10 is 10%.
+    min_ms : float
+        Allowed absolute slowdown in milliseconds.
+
+    returns
+    -------
+    list of dicts with key, baseline_ms, current_ms, ratio and status, which is one of
+    "regression", "improvement", "ok", "new" (not in the baseline) or "missing" (not in current).
+    '''
+    before = {result["key"]: result for result in baseline["results"]}
+    after = {result["key"]: result for result in current["results"]}
+
+    rows = []
+    for key in list(before) + [key for key in after if key not in before]:
+        old = before[key]["median_ms"] if key in before else None
+        new = after[key]["median_ms"] if key in after else None
+
+        if old is None:
+            status, ratio = "new", None
+        elif new is None:
+            status, ratio = "missing", None
+        else:
+            ratio = new / old if old else float("inf")
+            if ratio > 1 + threshold and new - old > min_ms:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold) and old - new > min_ms:
+                status = "improvement"
+            else:
+                status = "ok"
+        rows.append({"key": key, "baseline_ms": old, "current_ms": new, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_rows(rows):
+    def ms(value):
+        return f"{value:10.3f}" if value is not None else f"{'-':>10}"
+
+    lines = [f"{'case':<72} {'baseline':>10} {'current':>10} {'ratio':>7}  status"]
+    for row in rows:
+        ratio = f"{row['ratio']:7.2f}" if row["ratio"] is not None else f"{'-':>7}"
+        lines.append(f"{row['key']:<72} {ms(row['baseline_ms'])} {ms(row['current_ms'])} {ratio}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Compare two benchmark results files and flag regressions.")
+    parser.add_argument("baseline", nargs = "?", default = BASELINE, help = f"results file to compare against, {BASELINE} by default")
+    parser.add_argument("current", nargs = "?", default = LATEST, help = f"results file to check, {LATEST} by default")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "allowed relative slowdown (0.10 = 10%%)")
+    parser.add_argument("--min-ms", type = float, default = 0.05, help = "allowed absolute slowdown in ms")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}, record one with python -m benchmarks.run --save-baseline")
+
+    baseline, current = load(args.baseline), load(args.current)
+    for name in ("commit", "machine", "cpus", "quick"):
+        if baseline["meta"].get(name) != current["meta"].get(name):
+            print(f"note: {name} differs ({baseline['meta'].get(name)} vs {current['meta'].get(name)})")
+
+    rows = compare(baseline, current, threshold = args.threshold, min_ms = args.min_ms)
+    print(format_rows(rows))
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,28 @@
+import numpy as np
+from benchmarks.harness import Case, init_pygame
+
+
+def cases(quick = False):
+    pygame = init_pygame()
+    from astronim.objects.glow import build_glow_sprite, draw_glow_circle
+
+    radii = (2, 8) if quick else (2, 8, 20)
+    color = (255, 200, 100)
+
+    # what every cache miss costs
+    for radius in radii:
+        yield Case("glow", "build_glow_sprite", {"radius": radius, "glow_radius": radius * 8},
+                   run = lambda r=radius: build_glow_sprite(color, r, r * 8), unit = "sprites")
+
+    # the per-frame cost once sprites are cached: one blit per star
+    count = 200
+    surface = pygame.Surface((1280, 720))
+    rng = np.random.default_rng(0)
+    centers = np.column_stack([rng.integers(0, 1280, count), rng.integers(0, 720, count)]).tolist()
+    for radius in radii:
+        def blits(r=radius):
+            for center in centers:
+                draw_glow_circle(surface, color, center, r, r * 8)
+
+        yield Case("glow", "draw_glow_circle", {"radius": radius, "glow_radius": radius * 8, "count": count},
+                   run = blits, items = count, unit = "glows")
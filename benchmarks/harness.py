@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import platform
+import subprocess
+import statistics
+from dataclasses import dataclass, field
+import numpy as np
+
+
+@dataclass
+class Case:
+    '''One benchmark: run() is timed over and over, after setup has been done by the module that made it.
+
+    Attributes
+    ----------
+    group : str
+        Module the case comes from, e.g. "physics".
+    name : str
+        What is measured, e.g. "updateParticles".
+    params : dict
+        Settings of this case. Together with group and name they make up its key.
+    run : callable
+        One iteration, called without arguments.
+    teardown : callable, optional
+        Called once after timing, for example to stop an encoder.
+    items : int
+        Units of work done by one iteration (frames, sprites, ...), used for the throughput.
+    unit : str
+        Name of those units.
+    skip : str, optional
+        Reason the case can't run here. It is reported but not timed.
+    '''
+    group: str
+    name: str
+    params: dict = field(default_factory=dict)
+    run: callable = None
+    teardown: callable = None
+    items: int = 1
+    unit: str = "calls"
+    skip: str = None
+
+    @property
+    def key(self):
+        settings = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.group}.{self.name}[{settings}]"
+
+
+def measure(run, min_time = 0.2, min_repeats = 3, max_repeats = 1000, warmup = 1):
+    '''Times run() until min_time seconds and min_repeats calls have passed, or max_repeats calls.
+
+    returns
+    -------
+    np.ndarray of the seconds taken by every timed call.
+    '''
+    for _ in range(warmup):
+        run()
+
+    times = []
+    clock = time.perf_counter
+    start = clock()
+    while len(times) < max_repeats and (len(times) < min_repeats or clock() - start < min_time):
+        t = clock()
+        run()
+        times.append(clock() - t)
+    return np.array(times)
+
+
+def summarize(case, times):
+    '''The JSON entry for one case.'''
+    ms = times * 1000
+    median = float(np.median(ms))
+    return {
+        "key": case.key,
+        "group": case.group,
+        "name": case.name,
+        "params": case.params,
+        "repeats": len(ms),
+        "median_ms": median,
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+        "stdev_ms": float(statistics.stdev(ms)) if len(ms) > 1 else 0.0,
+        "throughput": case.items / (median / 1000) if median else float("inf"),
+        "unit": f"{case.unit}/s",
+    }
+
+
+def init_pygame():
+    '''Starts pygame without a window, the same way Universe(headless=True) does.'''
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.init()
+    return pygame
+
+
+def metadata(quick):
+    '''Where and with what the results were measured, so comparisons across machines can be spotted.'''
+    import pygame
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "quick": quick,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
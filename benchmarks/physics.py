@@ -0,0 +1,29 @@
+import numpy as np
+from astronim.utils.forces import calculateForceVectors
+from astronim.utils.leapfrog import updateParticles
+from astronim.utils.constants import AU
+from benchmarks.harness import Case
+
+
+def bodies(n, seed = 0):
+    '''n sun-like to planet-like masses spread over a few AU, with orbital-scale velocities.'''
+    rng = np.random.default_rng(seed)
+    masses = 10 ** rng.uniform(24, 30, n)
+    positions = rng.uniform(-5, 5, (n, 3)) * AU
+    velocities = rng.normal(0, 3e4, (n, 3))
+    return masses, positions, velocities
+
+
+def cases(quick = False):
+    sizes = (2, 8, 32, 64) if quick else (2, 8, 32, 128, 256)
+
+    for n in sizes:
+        masses, positions, velocities = bodies(n)
+        yield Case("physics", "calculateForceVectors", {"n": n},
+                   run = lambda m=masses, p=positions: calculateForceVectors(m, p), items = n, unit = "bodies")
+
+    for n in sizes:
+        masses, positions, velocities = bodies(n)
+        yield Case("physics", "updateParticles", {"n": n},
+                   run = lambda m=masses, p=positions, v=velocities: updateParticles(m, p, v, 8640),
+                   items = n, unit = "bodies")
@@ -0,0 +1,56 @@
+import sys
+import argparse
+from benchmarks.harness import init_pygame
+from benchmarks.render import scene
+
+
+# Minimum PSNR (dB) of SplatRenderer against the per-object Renderer, per (stars, galaxies) scene,
+# about 1 dB under the lowest measured value. compare_renderers draws every galaxy star on the
+# Renderer side, so galaxy LOD doesn't count. Isolated stars should match closely. Where glows
+# overlap the splat path adds their light while pygame alpha-blends them, so dense scenes (galaxy
+# cores most of all) differ by design; a blank frame still scores several dB below every bound.
+THRESHOLDS = {
+    (10, 0): 38.0,
+    (100, 0): 25.0,
+    (1000, 0): 23.5,
+    (10, 1): 22.5,
+    (10, 4): 17.0,
+}
+
+
+def check(resolutions = ((640, 360), (1280, 720)), thresholds = THRESHOLDS, log = print):
+    '''Renders every scene with both backends through compare_renderers and checks the PSNR.
+
+    returns
+    -------
+    list of dicts with the scene, resolution, every metric of compare_renderers, the threshold
+    and whether it passed.
+    '''
+    init_pygame()
+    from astronim.splat_renderer import compare_renderers
+
+    rows = []
+    for width, height in resolutions:
+        for (n_stars, n_galaxies), minimum in thresholds.items():
+            metrics = compare_renderers(scene(n_stars, n_galaxies), width, height)
+            row = {"width": width, "height": height, "stars": n_stars, "galaxies": n_galaxies,
+                   **metrics, "min_psnr": minimum, "passed": metrics["psnr"] >= minimum}
+            rows.append(row)
+            if log:
+                log(f"{width}x{height} stars={n_stars:<5} galaxies={n_galaxies:<3} psnr {metrics['psnr']:6.2f} dB "
+                    f"(min {minimum:4.1f})  rmse {metrics['rmse']:6.2f}  pixels off {metrics['pixels_off']:6.2%}  "
+                    f"{'ok' if row['passed'] else 'FAIL'}")
+    return rows
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Check SplatRenderer output against the per-object Renderer.")
+    parser.parse_args(argv)
+    rows = check()
+    failed = [row for row in rows if not row["passed"]]
+    print(f"{len(failed)} of {len(rows)} scenes below their PSNR threshold" if failed else "all scenes within threshold")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from benchmarks.harness import Case, init_pygame
+
+
+def star_field(pygame, width, height, seed = 0):
+    '''A surface with a noisy star field, so the encoder has something realistic to compress.'''
+    rng = np.random.default_rng(seed)
+    pixels = np.zeros((width, height, 3), dtype=np.uint8)
+    stars = rng.random((width, height)) < 0.002
+    pixels[stars] = rng.integers(64, 256, (stars.sum(), 3))
+    surface = pygame.Surface((width, height))
+    pygame.surfarray.blit_array(surface, pixels)
+    return surface
+
+
+def cases(quick = False):
+    pygame = init_pygame()
+    from astronim.recorder import Recorder, OutputSpec, frame_buffer, pixel_format
+
+    resolutions = ((1280, 720),) if quick else ((1280, 720), (1920, 1080), (3840, 2160))
+
+    for width, height in resolutions:
+        params = {"width": width, "height": height}
+        surface = star_field(pygame, width, height)
+        pix_fmt = pixel_format(surface)
+
+        # what the encoder thread is handed for every frame
+        yield Case("recorder", "frame_buffer", params,
+                   run = lambda s=surface, f=pix_fmt: bytes(memoryview(frame_buffer(s, f))), unit = "frames")
+
+        recorder = Recorder(stream = False)
+        recorder.start()
+        yield Case("recorder", "save_frame_png", params,
+                   run = lambda r=recorder, s=surface: r.save_frame(s), teardown = recorder.discard, unit = "frames")
+
+        if shutil.which("ffmpeg") is None:
+            yield Case("recorder", "save_frame_stream", params, skip = "ffmpeg not found")
+            continue
+
+        # once the writer queue is full, save_frame runs at the speed ffmpeg encodes
+        outdir = tempfile.mkdtemp()
+        recorder = Recorder(outputs = [OutputSpec(preset = "ultrafast")])
+        recorder.start((width, height))
+
+        def stop_stream(recorder=recorder, outdir=outdir):
+            recorder.stop(output_file = os.path.join(outdir, "benchmark.mp4"))
+            shutil.rmtree(outdir, ignore_errors = True)
+
+        yield Case("recorder", "save_frame_stream", {**params, "preset": "ultrafast"},
+                   run = lambda r=recorder, s=surface: r.save_frame(s), teardown = stop_stream, unit = "frames")
@@ -0,0 +1,46 @@
+import numpy as np
+from benchmarks.harness import Case, init_pygame
+
+
+def scene(n_stars, n_galaxies, seed = 0):
+    '''A simulation with n_stars drawn stars and n_galaxies galaxies spread in front of the camera.'''
+    from astronim.simulation import Simulation
+    from astronim.objects import Galaxy
+    from astronim.utils.tools import Vec3
+
+    rng = np.random.default_rng(seed)
+    simulation = Simulation()
+    if n_stars:
+        positions = np.column_stack([rng.uniform(-15, 15, n_stars), rng.uniform(-8, 8, n_stars),
+                                     rng.uniform(20, 60, n_stars)])
+        simulation.add_bodies(10 ** rng.uniform(24, 30, n_stars), positions, np.zeros((n_stars, 3)),
+                              render = np.arange(n_stars), radius = 0.5)
+
+    for i in range(n_galaxies):
+        x, y, z = rng.uniform(-300, 300), rng.uniform(-100, 100), rng.uniform(300, 600)
+        simulation.add_static(Galaxy(Vec3(x, y, z), seed = seed + i))
+    return simulation
+
+
+def cases(quick = False):
+    pygame = init_pygame()
+    from astronim.renderer import Renderer
+
+    resolutions = ((640, 360), (1280, 720)) if quick else ((640, 360), (1280, 720), (1920, 1080))
+    star_counts = (10, 100) if quick else (10, 100, 1000)
+    galaxy_counts = (1, 4) if quick else (1, 4, 16)
+    scenes = [(n, 0) for n in star_counts] + [(10, n) for n in galaxy_counts]
+
+    for width, height in resolutions:
+        for n_stars, n_galaxies in scenes:
+            simulation = scene(n_stars, n_galaxies)
+            renderer = Renderer(pygame.Surface((width, height)), width, height, present = False)
+
+            def frame(renderer=renderer, simulation=simulation):
+                # a slowly turning camera, so view-dependent caches behave as they do in an animation
+                renderer.ry += 0.002
+                renderer.draw(simulation)
+
+            yield Case("render", "Renderer.draw",
+                       {"width": width, "height": height, "stars": n_stars, "galaxies": n_galaxies},
+                       run = frame, unit = "frames")
@@ -0,0 +1,97 @@
+import os
+import json
+import shutil
+import argparse
+from benchmarks import physics, render, glow, recorder
+from benchmarks.harness import measure, summarize, metadata
+from benchmarks.compare import BASELINE, LATEST
+
+
+GROUPS = {"physics": physics, "render": render, "glow": glow, "recorder": recorder}
+
+
+def run(groups = tuple(GROUPS), quick = False, match = None, min_time = 0.2, max_repeats = 1000, log = print):
+    '''Runs the cases of the given groups.
+
+    params
+    ------
+    groups : iterable of str
+        Keys of GROUPS to run.
+    quick : bool
+        Smaller sizes and fewer resolutions, for a check that takes seconds instead of minutes.
+    match : str, optional
+        Only run cases whose key contains this string.
+    min_time : float
+        Seconds spent timing each case (at least 3 calls are always made).
+    max_repeats : int
+        Upper bound on timed calls per case.
+    log : callable
+        Called with one line per finished case, None to stay quiet.
+
+    returns
+    -------
+    dict with "meta" (see harness.metadata), "results" (see harness.summarize) and "skipped".
+    '''
+    results, skipped = [], []
+    for group in groups:
+        for case in GROUPS[group].cases(quick):
+            if match and match not in case.key:
+                # cases can hold resources from their setup (an open encoder), release them unused
+                if case.teardown is not None:
+                    case.teardown()
+                continue
+            if case.skip:
+                skipped.append({"key": case.key, "reason": case.skip})
+                if log:
+                    log(f"{case.key:<72} skipped: {case.skip}")
+                continue
+
+            try:
+                times = measure(case.run, min_time = min_time, max_repeats = max_repeats)
+            finally:
+                if case.teardown is not None:
+                    case.teardown()
+
+            result = summarize(case, times)
+            results.append(result)
+            if log:
+                log(f"{case.key:<72} {result['median_ms']:10.3f} ms  {result['throughput']:12.1f} {result['unit']}")
+
+    return {"meta": metadata(quick), "results": results, "skipped": skipped}
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Run the astronim benchmarks and save the timings as JSON.")
+    parser.add_argument("groups", nargs = "*", help = f"groups to run, any of {', '.join(GROUPS)} (all by default)")
+    parser.add_argument("-o", "--output", default = LATEST)
+    parser.add_argument("--quick", action = "store_true", help = "smaller sizes, for a fast check")
+    parser.add_argument("-k", "--match", help = "only run cases whose key contains this string")
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "seconds spent timing each case")
+    parser.add_argument("--baseline", help = "compare against this results file afterwards, see benchmarks.compare")
+    parser.add_argument("--save-baseline", action = "store_true",
+                        help = f"also store the results as the baseline, {BASELINE}")
+    parser.add_argument("--threshold", type = float, default = 0.10,
+                        help = "relative slowdown counted as a regression when --baseline is given")
+    args = parser.parse_args(argv)
+    unknown = set(args.groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    report = run(args.groups or list(GROUPS), quick = args.quick, match = args.match, min_time = args.min_time)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok = True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent = 2)
+    print(f"wrote {len(report['results'])} results to {args.output}")
+    if args.save_baseline:
+        shutil.copyfile(args.output, BASELINE)
+        print(f"saved them as the baseline, {BASELINE}")
+
+    if args.baseline:
+        from benchmarks.compare import main as compare
+        return compare([args.baseline, args.output, "--threshold", str(args.threshold)])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())